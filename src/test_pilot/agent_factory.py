@@ -0,0 +1,200 @@
+"""
+agent_factory
+
+Construction of the ReAct agent around the MCP tools.
+
+`AgentSettings` collects the per-run options selected on the command line and
+builds a fresh agent for every session: tool middlewares are instantiated per
+agent (they may hold per-session state), and message transforms run in a
+`pre_model_hook` so they shape what the LLM sees without rewriting the stored
+conversation. `run` executes a prompt on an open MCP session, replaying and
+recording tool-call traces and checkpointing the graph state when enabled.
+"""
+
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from functools import partial
+
+from langchain_core.messages import AIMessage
+from langgraph.prebuilt import create_react_agent
+
+from test_pilot.checkpoint import open_checkpointer, resume_state, thread_id
+from test_pilot.compaction import SnapshotCompactor, compact_snapshot_history
+from test_pilot.events import sink, stream_agent
+from test_pilot.fast_path import execute_prefix, fast_path_message, mechanical_prefix
+from test_pilot.handoff import phase_outcome
+from test_pilot.history import PromptSizeLogger, apply_history_policy
+from test_pilot.page_metrics import EVALUATE_TOOL, PageMetrics
+from test_pilot.replay import TRACE_DIR, TraceRecorder, load_trace, replay_report, replay_trace, resume_message, save_trace
+from test_pilot.snapshot_diff import SnapshotDiffer
+from test_pilot.suite import suite_hash
+from test_pilot.tool_catalog import select_tools
+from test_pilot.tool_middleware import apply_middleware
+from test_pilot.watchdog import Watchdog
+
+
+@dataclass
+class AgentSettings:
+    compact_snapshots: bool = False
+    snapshot_max_chars: int = 20000
+    keep_snapshots: int = 1
+    snapshot_diff: bool = False
+    record_traces: bool = False
+    replay_traces: bool = False
+    trace_dir: str = TRACE_DIR
+    tools: list = None
+    profiler: object = None
+    checkpoint_db: str = None
+    history: str = "full"
+    history_keep: int = 6
+    history_max_chars: int = 2000
+    watchdog_repeats: int = 4
+    watchdog_window: int = 8
+    watchdog_stall_steps: int = 10
+    fast_path: bool = False
+    handoff: object = None
+    page_metrics: bool = False
+
+    def tool_middlewares(self):
+        middlewares = []
+        if self.compact_snapshots:
+            middlewares.append(SnapshotCompactor(max_chars=self.snapshot_max_chars))
+        # Inside the compactor so diffs are computed on the raw trees
+        if self.snapshot_diff:
+            middlewares.append(SnapshotDiffer())
+        return middlewares
+
+    def message_transforms(self):
+        transforms = []
+        if self.compact_snapshots:
+            transforms.append(partial(compact_snapshot_history, keep_last=self.keep_snapshots))
+        if self.history != "full":
+            transforms.append(partial(
+                apply_history_policy, policy=self.history, keep=self.history_keep, max_chars=self.history_max_chars,
+            ))
+        return transforms
+
+    def watchdog(self):
+        """A fresh loop/stall watchdog for one run, or None when disabled"""
+        if not self.watchdog_repeats and not self.watchdog_stall_steps:
+            return None
+        return Watchdog(self.watchdog_repeats, self.watchdog_window, self.watchdog_stall_steps)
+
+    def build(self, llm, tools, recursion_limit=100, extra_middlewares=(), label="agent", checkpointer=None):
+        """Create a ReAct agent over `tools` with the configured middlewares and hooks"""
+        middlewares = self.tool_middlewares() + list(extra_middlewares)
+        callbacks = [PromptSizeLogger(label)]
+        if self.profiler is not None:
+            # Innermost, so only the MCP round trip is timed as browser time
+            middlewares.append(self.profiler.tool_middleware(label))
+            callbacks.append(self.profiler.llm_callback(label))
+        tools = apply_middleware(tools, middlewares)
+        transforms = self.message_transforms()
+        pre_model_hook = _pre_model_hook(transforms) if transforms else None
+        agent = create_react_agent(llm, tools, pre_model_hook=pre_model_hook, checkpointer=checkpointer)
+        return agent.with_config(recursion_limit=recursion_limit, callbacks=callbacks)
+
+    async def run(self, llm, session, tools, message, label, recursion_limit=100, tool_patterns=None):
+        """Run `message` on an open MCP session and return the last agent step.
+
+        Only the tools matching `tool_patterns` (declared by the suite or
+        phase), or else the run-wide `tools` patterns, are bound to the agent.
+        The run is logged as a phase (`phase_started`/`phase_finished`) and,
+        with a `handoff` formatter, recorded as a phase of the current suite.
+        """
+        events = sink()
+        phase = self.handoff.phase_started(label) if self.handoff is not None else None
+        events.emit("phase_started", label=label)
+        started = time.monotonic()
+        try:
+            last_step = await self._run(llm, session, tools, message, label, recursion_limit, tool_patterns, phase)
+        except BaseException as e:
+            if phase:
+                phase.finish(error=e)
+            duration_ms = int((time.monotonic() - started) * 1000)
+            events.emit("phase_finished", label=label, status="error", error=f"{type(e).__name__}: {e}", duration_ms=duration_ms)
+            raise
+        if phase:
+            phase.finish(last_step)
+        status, detail = phase_outcome(last_step, phase.data["tool_errors"] if phase else 0)
+        duration_ms = int((time.monotonic() - started) * 1000)
+        events.emit("phase_finished", label=label, status=status, error=detail, duration_ms=duration_ms)
+        return last_step
+
+    async def _run(self, llm, session, tools, message, label, recursion_limit, tool_patterns, phase=None):
+        # The metrics are collected through browser_evaluate even when it is not bound to the agent
+        metrics = None
+        if self.page_metrics and EVALUATE_TOOL in {tool.name for tool in tools}:
+            metrics = PageMetrics(session, label, phase.page_loaded if phase else None)
+        tools = select_tools(tools, tool_patterns or self.tools)
+        key = suite_hash(message)
+        recorder = TraceRecorder() if self.record_traces or self.replay_traces else None
+        extra_middlewares = [middleware for middleware in (recorder, metrics) if middleware]
+        checkpoints = open_checkpointer(self.checkpoint_db) if self.checkpoint_db else nullcontext()
+        async with checkpoints as saver:
+            agent = self.build(llm, tools, recursion_limit, extra_middlewares, label, saver)
+            config, resumed = None, False
+            inputs = {"messages": message}
+            if saver:
+                config = {"configurable": {"thread_id": thread_id(label, key)}}
+                state, resume_inputs = await resume_state(agent, config)
+                if state == "finished":
+                    await saver.adelete_thread(config["configurable"]["thread_id"])
+                    return resume_inputs
+                if state == "resume":
+                    print(f"⏯️  {label}: resuming from checkpoint {config['configurable']['thread_id']}")
+                    inputs, resumed = resume_inputs, True
+
+            if self.replay_traces and not resumed:
+                trace = load_trace(key, self.trace_dir)
+                if trace:
+                    steps = trace["steps"]
+                    print(f"🔁 {label}: replaying {len(steps)} recorded tool calls")
+                    completed, error = await replay_trace(session, steps, label)
+                    if error is None:
+                        print(f"✅ {label}: replay completed without the LLM")
+                        return {"agent": {"messages": [AIMessage(content=replay_report(steps))]}}
+                    print(f"⚠️  {label}: replay diverged at step {completed + 1}, handing over to the agent")
+                    recorder.steps = steps[:completed]
+                    inputs = {"messages": resume_message(message, recorder.steps, steps[completed], error)}
+
+            if self.fast_path and not resumed and inputs.get("messages") is message:
+                inputs = await self._run_fast_path(session, tools, message, label, recorder, metrics) or inputs
+
+            last_step = await stream_agent(agent, inputs, label, config, self.watchdog(), phase.observe if phase else None)
+            if saver:
+                # Only interrupted runs keep their thread, for the next run to resume
+                await saver.adelete_thread(config["configurable"]["thread_id"])
+            # Only runs with a passed verdict are recorded, since a replayed trace reports every
+            # step as passed; a resumed run only saw part of the tool calls
+            tool_errors = phase.data["tool_errors"] if phase else 0
+            if recorder and not resumed and phase_outcome(last_step, tool_errors)[0] == "passed":
+                save_trace(key, recorder.steps, label, self.trace_dir)
+            return last_step
+
+    async def _run_fast_path(self, session, tools, message, label, recorder, metrics=None):
+        """Execute the leading literal steps directly; return the agent inputs for the rest, or None"""
+        steps = mechanical_prefix(message, {tool.name for tool in tools})
+        if not steps:
+            return None
+        executed, page_text = await execute_prefix(session, steps, label)
+        if not executed:
+            return None
+        if metrics and page_text:
+            await metrics.observe(page_text)
+        print(f"⚡ {label}: executed {len(executed)} literal step(s) without the LLM")
+        if recorder:
+            recorder.steps.extend({"tool": step["tool"], "arguments": step["arguments"]} for step in executed)
+        if page_text and self.compact_snapshots:
+            page_text = SnapshotCompactor(max_chars=self.snapshot_max_chars).compact(page_text)
+        return {"messages": fast_path_message(message, executed, page_text)}
+
+
+def _pre_model_hook(transforms):
+    def hook(state):
+        messages = state["messages"]
+        for transform in transforms:
+            messages = transform(messages)
+        return {"llm_input_messages": messages}
+    return hook
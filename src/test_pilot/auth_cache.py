@@ -0,0 +1,143 @@
+"""
+auth_cache
+
+Cache of authenticated Playwright storage states, so two-stage runs skip login.
+
+`--two-stage-mode` used to repeat the headed login on every invocation and only
+judged the saved state by counting its cookies and origins. States are now
+cached per target origin and account (both read from the suite text), checked
+against the cache TTL and the expiry of the persistent cookies for the target
+site, and empty states such as `{"cookies": [], "origins": []}` are rejected.
+A valid cached state is handed straight to the main stage; the login stage
+only runs on a miss or after the main stage reports an authentication failure.
+
+An authentication failure is reported with the `AUTH_FAILURE` marker on a line
+of its own (see `AUTH_FAILURE_INSTRUCTION`), not detected from the wording of
+the report, so "no authentication failure observed" is not one.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from urllib.parse import urlparse
+
+AUTH_CACHE_DIR = os.path.join(".test_pilot", "auth")
+AUTH_FAILURE = "AUTH_FAILURE"
+AUTH_FAILURE_INSTRUCTION = f"If you see a login page, stop and end your report with {AUTH_FAILURE} on a line of its own"
+AUTH_FAILURE_LINE = re.compile(rf"^[\s*_`]*{AUTH_FAILURE}[\s*_`]*$", re.MULTILINE)
+
+WEBSITE_LINE = re.compile(r"^\s*(?:Website|URL|Base URL)\s*:\s*(https?://\S+)", re.IGNORECASE | re.MULTILINE)
+ANY_URL = re.compile(r"https?://[^\s)\"'`>]+")
+ACCOUNT_LINE = re.compile(r"(?:username|user name|email|account)\s*:\s*`?([^\s`]+)", re.IGNORECASE)
+
+
+def is_auth_failure(report):
+    """True when the report carries the `AUTH_FAILURE` marker line"""
+    return bool(report) and AUTH_FAILURE_LINE.search(report) is not None
+
+
+def suite_identity(test_suite):
+    """`(origin, account)` the suite logs into, read from its 'Website:' and 'username:' lines"""
+    match = WEBSITE_LINE.search(test_suite) or ANY_URL.search(test_suite)
+    origin = None
+    if match:
+        url = urlparse(match.group(1) if match.re is WEBSITE_LINE else match.group(0))
+        origin = f"{url.scheme}://{url.netloc}"
+    account = ACCOUNT_LINE.search(test_suite)
+    return origin, account.group(1) if account else None
+
+
+def _site(host):
+    # Login usually happens on a sibling host (login.icims.com for
+    # configrariet.icims.com), so cookies are matched on the last two labels
+    return ".".join(host.lstrip(".").split(".")[-2:])
+
+
+def state_expiry(state, origin, saved_at, ttl):
+    """Unix time at which a storage state stops being trusted.
+
+    That is the earlier of `saved_at + ttl` and the first expiry among the
+    persistent cookies of the target site. Session cookies (`expires == -1`)
+    are bounded by the TTL only.
+    """
+    expiry = saved_at + ttl
+    site = _site(urlparse(origin).hostname or "") if origin else None
+    for cookie in state.get("cookies", []):
+        expires = cookie.get("expires", -1)
+        if expires is None or expires < 0:
+            continue
+        if site and _site(cookie.get("domain", "")) != site:
+            continue
+        expiry = min(expiry, expires)
+    return expiry
+
+
+def validate_storage_state(path, origin=None, ttl=3600, now=None):
+    """Return `(valid, reason)` for the storage state file at `path`"""
+    now = time.time() if now is None else now
+    try:
+        with open(path, "r") as f:
+            state = json.load(f)
+        saved_at = os.path.getmtime(path)
+    except FileNotFoundError:
+        return False, "no storage state saved"
+    except (OSError, ValueError) as e:
+        return False, f"unreadable storage state: {e}"
+    if not isinstance(state, dict):
+        return False, "storage state is not a JSON object"
+    cookies, origins = state.get("cookies", []), state.get("origins", [])
+    if not cookies and not origins:
+        return False, "storage state is empty (no cookies or origins)"
+    expiry = state_expiry(state, origin, saved_at, ttl)
+    if expiry <= now:
+        return False, f"storage state expired {int(now - expiry)}s ago"
+    return True, f"{len(cookies)} cookies, {len(origins)} origins, valid for {int(expiry - now)}s"
+
+
+class StorageStateCache:
+    """Storage states keyed by target origin and account, trusted for at most `ttl` seconds"""
+
+    def __init__(self, cache_dir=AUTH_CACHE_DIR, ttl=3600):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+
+    def path(self, test_suite):
+        origin, account = suite_identity(test_suite)
+        key = hashlib.sha256(json.dumps([origin, account]).encode()).hexdigest()[:16]
+        host = re.sub(r"[^A-Za-z0-9_.-]", "_", urlparse(origin).netloc if origin else "unknown")
+        return os.path.join(self.cache_dir, f"{host}-{key}.json")
+
+    def restore(self, test_suite, storage_file):
+        """Copy a valid cached state to `storage_file`; return False on a cache miss"""
+        path = self.path(test_suite)
+        valid, reason = validate_storage_state(path, suite_identity(test_suite)[0], self.ttl)
+        if not valid:
+            print(f"Auth cache miss ({reason})")
+            return False
+        temp_path = f"{storage_file}.{os.getpid()}.tmp"
+        shutil.copyfile(path, temp_path)
+        os.replace(temp_path, storage_file)
+        print(f"✅ Auth cache hit: reusing {path} ({reason})")
+        return True
+
+    def store(self, test_suite, storage_file):
+        """Cache `storage_file` if it holds a valid state; return `(valid, reason)`"""
+        valid, reason = validate_storage_state(storage_file, suite_identity(test_suite)[0], self.ttl)
+        if not valid:
+            return valid, reason
+        path = self.path(test_suite)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        shutil.copyfile(storage_file, temp_path)
+        os.replace(temp_path, path)
+        print(f"✅ Cached authenticated storage state at {path}")
+        return valid, reason
+
+    def invalidate(self, test_suite):
+        try:
+            os.remove(self.path(test_suite))
+        except FileNotFoundError:
+            pass
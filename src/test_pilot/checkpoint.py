@@ -0,0 +1,107 @@
+"""
+checkpoint
+
+Durable agent checkpoints and phase-completion markers for resuming runs.
+
+With a checkpoint database the ReAct graph saves its state after every step
+in a local SQLite file (LangGraph's `AsyncSqliteSaver`), in a thread keyed by
+the suite, label and prompt. A run that dies half way (provider error, MCP
+crash) leaves its thread behind, and the next run with the same prompt picks
+up from the last saved step instead of starting over; threads of runs that
+finish are deleted. `PhaseMarkers` records completed phases and stages in
+the same file, so a rerun skips them and reuses the saved storage state
+instead of repeating login and earlier phases.
+"""
+
+import os
+import sqlite3
+from contextlib import asynccontextmanager, contextmanager
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from test_pilot.events import current_suite, utc_timestamp
+
+CHECKPOINT_DB = os.path.join(".test_pilot", "checkpoints.sqlite")
+
+RESUMED_NOTE = (
+    "NOTE: This run was interrupted and has been resumed in a new browser session. "
+    "The page state from the earlier steps is gone: navigate back to where you were "
+    "(the saved login state is loaded) and continue with the remaining steps."
+)
+
+
+def thread_id(label, key):
+    """Checkpoint thread for a prompt `key` run under `label` in the current suite"""
+    suite = current_suite.get()
+    return f"{suite}/{label}-{key}" if suite else f"{label}-{key}"
+
+
+@asynccontextmanager
+async def open_checkpointer(path=CHECKPOINT_DB):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    async with AsyncSqliteSaver.from_conn_string(path) as saver:
+        yield saver
+
+
+async def resume_state(agent, config):
+    """How to continue the checkpoint thread in `config`.
+
+    Returns `("fresh", None)` when there is nothing to resume, `("finished",
+    last_step)` when the thread already completed, or `("resume", inputs)`
+    with the inputs that continue an interrupted thread.
+    """
+    state = await agent.aget_state(config)
+    if not state.values.get("messages"):
+        return "fresh", None
+    if not state.next:
+        return "finished", {"agent": {"messages": [state.values["messages"][-1]]}}
+    if "tools" in state.next:
+        # The pending tool calls are executed again on the new browser
+        return "resume", None
+    return "resume", {"messages": [HumanMessage(content=RESUMED_NOTE)]}
+
+
+class PhaseMarkers:
+    """Completed phases and stages per suite, stored next to the agent checkpoints"""
+
+    def __init__(self, path=CHECKPOINT_DB):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS phase_markers ("
+                "suite TEXT NOT NULL, phase TEXT NOT NULL, report TEXT, completed_at TEXT, "
+                "PRIMARY KEY (suite, phase))"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def completed(self, suite_key):
+        """Reports of the completed phases of `suite_key`, keyed by phase"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT phase, report FROM phase_markers WHERE suite = ?", (suite_key,)).fetchall()
+        return dict(rows)
+
+    def mark(self, suite_key, phase, report):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO phase_markers (suite, phase, report, completed_at) VALUES (?, ?, ?, ?)",
+                (suite_key, str(phase), report, utc_timestamp()),
+            )
+
+    def clear(self, suite_key):
+        """Forget the markers of a suite once it has completed as a whole"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM phase_markers WHERE suite = ?", (suite_key,))
@@ -0,0 +1,114 @@
+"""
+compaction
+
+Snapshot compaction for MCP tool results fed to the LLM.
+
+`browser_snapshot`, `browser_navigate` and most interaction tools return the
+full accessibility tree of the page, and the ReAct conversation re-sends every
+previous result on each LLM call. Two measures keep the per-step prompt flat:
+
+- `SnapshotCompactor` is a tool middleware that prunes structural noise nodes
+  (unnamed generic/presentation containers, separators, unnamed images) and
+  caps the snapshot size before the result enters the conversation.
+- `compact_snapshot_history` is a pre-model transform that replaces all but
+  the most recent snapshots in the history with a short placeholder.
+"""
+
+import re
+
+from langchain_core.messages import ToolMessage
+
+from test_pilot.tool_middleware import result_text, with_text
+
+SNAPSHOT_BLOCK = re.compile(r"```yaml\n(.*?)```", re.DOTALL)
+NOISE_NODE = re.compile(
+    r"^\s*- (?:generic|none|presentation|separator|img|group)(?: \[[^\]]*\])*:?\s*$"
+)
+PAGE_LINE = re.compile(r"^- Page (?:URL|Title): .*$", re.MULTILINE)
+SNAPSHOT_PLACEHOLDER = "[accessibility snapshot omitted: superseded by a newer snapshot]"
+
+
+def has_snapshot(text):
+    return "Page Snapshot" in text and SNAPSHOT_BLOCK.search(text) is not None
+
+
+def prune_snapshot(yaml_text):
+    """Drop unnamed structural nodes and consecutive duplicate lines from an aria snapshot"""
+    kept = []
+    for line in yaml_text.splitlines():
+        if NOISE_NODE.match(line):
+            continue
+        if kept and kept[-1] == line:
+            continue
+        kept.append(line)
+    return "\n".join(kept) + "\n"
+
+
+def cap_snapshot(yaml_text, max_chars):
+    """Truncate a snapshot on a line boundary so it fits in `max_chars`"""
+    if max_chars is None or len(yaml_text) <= max_chars:
+        return yaml_text
+    lines = yaml_text.splitlines()
+    kept, size = [], 0
+    for line in lines:
+        if size + len(line) + 1 > max_chars:
+            break
+        kept.append(line)
+        size += len(line) + 1
+    omitted = len(lines) - len(kept)
+    kept.append(f"# ... {omitted} more lines truncated to keep the prompt small")
+    return "\n".join(kept) + "\n"
+
+
+def _replace_snapshot(text, transform):
+    return SNAPSHOT_BLOCK.sub(lambda match: "```yaml\n" + transform(match.group(1)) + "```", text)
+
+
+class SnapshotCompactor:
+    """Tool middleware pruning and size-capping accessibility snapshots in tool results"""
+
+    def __init__(self, max_chars=20000, prune=True):
+        self.max_chars = max_chars
+        self.prune = prune
+
+    def compact(self, text):
+        if not has_snapshot(text):
+            return text
+
+        def transform(yaml_text):
+            if self.prune:
+                yaml_text = prune_snapshot(yaml_text)
+            return cap_snapshot(yaml_text, self.max_chars)
+
+        return _replace_snapshot(text, transform)
+
+    async def __call__(self, tool_name, arguments, call_next):
+        result = await call_next(arguments)
+        text = result_text(result)
+        compacted = self.compact(text)
+        return result if compacted is text else with_text(result, compacted)
+
+
+def _stub(message):
+    text = result_text((message.content,))
+    page = "\n".join(PAGE_LINE.findall(text))
+    content = SNAPSHOT_BLOCK.sub(SNAPSHOT_PLACEHOLDER, text) if not page else f"{page}\n{SNAPSHOT_PLACEHOLDER}"
+    return ToolMessage(
+        content=content,
+        tool_call_id=message.tool_call_id,
+        name=message.name,
+        id=message.id,
+        status=message.status,
+    )
+
+
+def compact_snapshot_history(messages, keep_last=1):
+    """Replace all but the `keep_last` most recent snapshot tool results with placeholders"""
+    snapshots = [
+        index for index, message in enumerate(messages)
+        if isinstance(message, ToolMessage) and has_snapshot(result_text((message.content,)))
+    ]
+    stale = set(snapshots[:-keep_last] if keep_last > 0 else snapshots)
+    if not stale:
+        return messages
+    return [_stub(message) if index in stale else message for index, message in enumerate(messages)]
@@ -0,0 +1,179 @@
+"""
+events
+
+Streaming NDJSON event log for agent runs.
+
+Each `agent.astream` chunk is summarized into one JSON line (node, tool calls
+with their arguments, tool result sizes, timestamps) and written immediately to
+a file or stdout, so a 100-step run neither accumulates every step in memory
+nor floods CI logs with full accessibility snapshot reprs. The log level
+controls how much of the tool payloads is written:
+
+- quiet:   run/stage/phase events only, no per-step events
+- info:    per-step events with tool names, arguments and payload sizes
+- verbose: additionally a truncated preview of message and tool payloads
+- debug:   full message and tool payloads
+
+The level only applies to the log: with a publish target (see
+`test_pilot.publish`) step events are published at every level, so a quiet
+console can still feed a live analyzer.
+"""
+
+import contextvars
+import json
+import sys
+import time
+from datetime import datetime, timezone
+
+from test_pilot.publish import PUBLISHED_EVENTS, Publisher
+from test_pilot.watchdog import stopped_step
+
+LOG_LEVELS = {"quiet": 0, "info": 1, "verbose": 2, "debug": 3}
+
+# Name of the suite the current asyncio task is running, added to every event
+# so interleaved lines from concurrent suites can be told apart
+current_suite = contextvars.ContextVar("current_suite", default=None)
+
+
+def utc_timestamp():
+    """Current UTC time as an ISO-8601 string with millisecond precision"""
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _content_text(content):
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "\n".join(part if isinstance(part, str) else str(part.get("text", part)) for part in content)
+    return str(content)
+
+
+class EventSink:
+    """Writes one JSON object per line to a file path, or stdout for "-" """
+
+    def __init__(self, target="-", level="info", preview_chars=300, publisher=None):
+        if level not in LOG_LEVELS:
+            raise ValueError(f"Unknown log level '{level}', expected one of {list(LOG_LEVELS)}")
+        self.level = LOG_LEVELS[level]
+        self.preview_chars = preview_chars
+        self.publisher = publisher
+        self._owns_stream = target not in (None, "-")
+        self._stream = open(target, "a", encoding="utf-8") if self._owns_stream else sys.stdout
+
+    def _line(self, event, fields):
+        record = {"ts": utc_timestamp(), "event": event}
+        suite = current_suite.get()
+        if suite is not None:
+            record["suite"] = suite
+        record.update(fields)
+        return json.dumps(record, default=str, ensure_ascii=False) + "\n"
+
+    def emit(self, event, **fields):
+        line = self._line(event, fields)
+        self._stream.write(line)
+        self._stream.flush()
+        if self.publisher is not None and event in PUBLISHED_EVENTS:
+            self.publisher.publish(line)
+
+    def publish(self, event, **fields):
+        """Send an event to the publish target only, e.g. one below the log level"""
+        if self.publisher is not None and event in PUBLISHED_EVENTS:
+            self.publisher.publish(self._line(event, fields))
+
+    def _payload(self, text):
+        if self.level >= LOG_LEVELS["debug"]:
+            return text
+        if self.level >= LOG_LEVELS["verbose"]:
+            return text[:self.preview_chars]
+        return None
+
+    def describe_message(self, message):
+        """Compact, JSON-serializable summary of a LangChain message"""
+        text = _content_text(message.content)
+        summary = {"type": message.type, "chars": len(text)}
+        tool_calls = getattr(message, "tool_calls", None)
+        if tool_calls:
+            summary["tool_calls"] = [{"name": call["name"], "args": call["args"]} for call in tool_calls]
+        if message.type == "tool":
+            summary["tool"] = message.name
+            summary["status"] = getattr(message, "status", "success")
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            summary["usage"] = dict(usage)
+        payload = self._payload(text)
+        if payload:
+            summary["content"] = payload
+        return summary
+
+    def step(self, label, index, step, step_ms=None):
+        """Record one `agent.astream` chunk"""
+        logged = self.level >= LOG_LEVELS["info"]
+        if not logged and self.publisher is None:
+            return
+        for node, update in step.items():
+            messages = (update or {}).get("messages", []) if isinstance(update, dict) else []
+            if not isinstance(messages, list):
+                messages = [messages]
+            if not messages:
+                continue
+            (self.emit if logged else self.publish)(
+                "step",
+                label=label,
+                step=index,
+                node=node,
+                step_ms=step_ms,
+                messages=[self.describe_message(message) for message in messages if hasattr(message, "content")],
+            )
+
+    def close(self):
+        if self._owns_stream:
+            self._stream.close()
+        if self.publisher is not None:
+            self.publisher.close()
+
+
+_sink = EventSink()
+
+
+def configure(target="-", level="info", publish=None):
+    """Replace the process-wide event sink, also publishing live events to `publish` (see `test_pilot.publish`)"""
+    global _sink
+    _sink.close()
+    _sink = EventSink(target, level, publisher=Publisher(publish) if publish else None)
+    return _sink
+
+
+def sink():
+    """The process-wide event sink"""
+    return _sink
+
+
+async def stream_agent(agent, inputs, label, config=None, watchdog=None, on_step=None):
+    """Stream an agent run into the event log, keeping only the last step in memory.
+
+    With a `watchdog` (see `test_pilot.watchdog`) the run is stopped as soon
+    as it is stuck, and the returned step carries the failure report under
+    "agent" and the structured reason under "watchdog". `on_step(step)` is
+    called with every chunk, e.g. to record it in the handoff JSON.
+    """
+    events = sink()
+    events.emit("agent_started", label=label)
+    last_step = None
+    index = 0
+    previous = time.monotonic()
+    async for step in agent.astream(inputs, config):
+        now = time.monotonic()
+        index += 1
+        events.step(label, index, step, int((now - previous) * 1000))
+        previous = now
+        last_step = step
+        if on_step:
+            on_step(step)
+        failure = watchdog.observe(step) if watchdog else None
+        if failure:
+            events.emit("agent_stalled", label=label, step=index, **failure)
+            print(f"🛑 {label}: stopped at step {index} by the watchdog ({failure['reason']}: {failure['detail']})")
+            last_step = stopped_step(failure, index)
+            break
+    events.emit("agent_finished", label=label, steps=index)
+    return last_step
@@ -0,0 +1,108 @@
+"""
+fanout
+
+Log in once, then run the main stage on N concurrent headless workers.
+
+Every worker gets its own `@playwright/mcp --storage-state` browser loaded from
+the same post-login storage state. When a worker lands on the login page (the
+main stage reports `AUTH_FAILURE`), it asks `SharedLogin` for a
+fresh state. Concurrent requests are collapsed into one re-login: the first
+caller logs in, the others wait for it and then retry with the new state.
+"""
+
+import asyncio
+import time
+
+from test_pilot.auth_cache import is_auth_failure
+from test_pilot.events import current_suite
+from test_pilot.handoff import report_failed
+
+
+class LoginFailed(Exception):
+    pass
+
+
+class SharedLogin:
+    """Single-flight login shared by concurrent workers.
+
+    `login()` is an async callable that produces the storage state and returns
+    True on success. Each successful login bumps `generation`; a worker passes
+    the generation it ran with to `refresh()`, so a re-login that already
+    happened while it was waiting is not repeated.
+    """
+
+    def __init__(self, login):
+        self._login = login
+        self._lock = asyncio.Lock()
+        self.generation = 0
+        self.logins = 0
+
+    async def refresh(self, seen_generation=None):
+        """Log in unless someone already did since `seen_generation`; return the current generation"""
+        async with self._lock:
+            if seen_generation is not None and seen_generation != self.generation:
+                return self.generation
+            self.logins += 1
+            if not await self._login():
+                raise LoginFailed(f"login attempt {self.logins} did not produce a usable storage state")
+            self.generation += 1
+            return self.generation
+
+
+async def run_fanout(workers, run_worker, shared_login, max_relogins=2):
+    """Log in once, then run `run_worker(index)` on `workers` concurrent workers.
+
+    `run_worker` returns the worker's markdown report. A worker whose report is
+    an authentication failure triggers a shared re-login and is retried, at
+    most `max_relogins` times. Returns one result dict per worker.
+    """
+    generation = await shared_login.refresh()
+    suite = current_suite.get()
+
+    async def run_one(index):
+        name = f"worker-{index + 1}"
+        current_suite.set(f"{suite}/{name}" if suite else name)
+        started = time.monotonic()
+        seen, attempts = generation, 0
+        result = {"worker": index + 1, "name": name, "status": "passed", "report": None, "error": None}
+        try:
+            while True:
+                attempts += 1
+                report = await run_worker(index)
+                if not is_auth_failure(report) or attempts > max_relogins:
+                    break
+                print(f"🔑 {name}: authentication failure, requesting a shared re-login")
+                seen = await shared_login.refresh(seen)
+            result["report"] = report
+            if report_failed(report):
+                result["status"] = "failed"
+        except Exception as e:
+            result["status"] = "error"
+            result["error"] = f"{type(e).__name__}: {e}"
+            print(f"❌ {name} failed: {result['error']}")
+        result.update(attempts=attempts, duration_ms=int((time.monotonic() - started) * 1000))
+        print(f"⏹️  Finished {name} ({result['status']}, {result['duration_ms']} ms, {attempts} attempt(s))")
+        return result
+
+    return await asyncio.gather(*(run_one(index) for index in range(workers)))
+
+
+def fanout_report(results, logins):
+    """Merge per-worker markdown reports into a single suite report"""
+    lines = [
+        "# Test Suite Report",
+        "",
+        f"Workers: {len(results)}, logins: {logins}",
+        "",
+        "| Worker | Status | Attempts | Duration (ms) |",
+        "|--------|--------|----------|---------------|",
+    ]
+    for result in results:
+        lines.append(f"| {result['name']} | {result['status']} | {result['attempts']} | {result['duration_ms']} |")
+    for result in results:
+        lines.extend(["", "---", "", f"## {result['name']}", ""])
+        if result["error"]:
+            lines.append(f"**Error:** {result['error']}")
+        else:
+            lines.append(result["report"] or "No report produced.")
+    return "\n".join(lines) + "\n"
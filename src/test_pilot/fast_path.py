@@ -0,0 +1,117 @@
+"""
+fast_path
+
+Deterministic execution of the literal steps at the start of a suite or phase.
+
+Steps such as "Navigate to https://configrariet.icims.com", "Take an
+accessibility snapshot" or "Wait 2 seconds" map one-to-one onto a Playwright
+MCP tool call, yet each costs a full LLM round trip in the ReAct agent.
+`mechanical_prefix` reads the step list of the first phase (or of the whole
+prompt when it has no phases) and returns the tool calls for the leading
+steps that match one of the `STEP_PATTERNS` exactly. They are executed
+directly on the MCP session and the agent starts at the first step that needs
+judgement, with the executed steps and the current page state in its prompt.
+Only the leading steps are taken: a later literal step may depend on an
+earlier ambiguous one, so it stays with the agent.
+"""
+
+import re
+
+from test_pilot.events import LOG_LEVELS, sink
+from test_pilot.suite import PHASE_HEADING
+
+LIST_ITEM = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+(.*\S)\s*$")
+GROUP_LABEL = re.compile(r"^\*\*[^*]+\*\*\s*:?$")
+
+STEP_PATTERNS = [
+    (
+        re.compile(r"(?:navigate|go|browse) to (?:the url )?<?(https?://[^\s>]+?)>?\.?", re.IGNORECASE),
+        lambda match: ("browser_navigate", {"url": match.group(1)}),
+    ),
+    (
+        re.compile(r"take (?:an? )?(?:accessibility )?snapshot(?: (?:to assess|of) (?:the )?(?:current )?page(?: state)?)?\.?", re.IGNORECASE),
+        lambda match: ("browser_snapshot", {}),
+    ),
+    (
+        re.compile(r"wait (?:for )?(?:\d+(?:\.\d+)?\s*-\s*)?(\d+(?:\.\d+)?) seconds?\.?", re.IGNORECASE),
+        lambda match: ("browser_wait_for", {"time": float(match.group(1))}),
+    ),
+    (
+        re.compile(r"press (?:the )?(Enter|Tab|Escape|Space|Backspace|ArrowDown|ArrowUp|ArrowLeft|ArrowRight)(?: key)?\.?", re.IGNORECASE),
+        lambda match: ("browser_press_key", {"key": match.group(1)}),
+    ),
+]
+
+
+def _step_lines(message):
+    heading = PHASE_HEADING.search(message)
+    body = message[heading.end():] if heading else message
+    for line in body.splitlines():
+        if line.strip().startswith("```") or not line.strip():
+            continue
+        if line.lstrip().startswith("#"):
+            if heading:
+                # The next heading ends the first phase
+                return
+            continue
+        item = LIST_ITEM.match(line)
+        # Group labels such as "1. **Initial Navigation**:" are not steps
+        if item and not GROUP_LABEL.match(item.group(1)):
+            yield item.group(1).replace("**", "")
+
+
+def mechanical_step(text):
+    """The `(tool, arguments)` a step maps onto literally, or None"""
+    for pattern, to_call in STEP_PATTERNS:
+        match = pattern.fullmatch(text.strip())
+        if match:
+            return to_call(match)
+    return None
+
+
+def mechanical_prefix(message, available_tools=None):
+    """Steps `{"step", "tool", "arguments"}` for the leading literal steps of the prompt"""
+    steps = []
+    for text in _step_lines(message):
+        call = mechanical_step(text)
+        if call is None or (available_tools is not None and call[0] not in available_tools):
+            break
+        steps.append({"step": text, "tool": call[0], "arguments": call[1]})
+    return steps
+
+
+async def execute_prefix(session, steps, label):
+    """Execute the steps on the MCP session until one fails.
+
+    Returns `(executed, page_text)`: the steps that succeeded and the text of
+    the last successful result that shows the page, for the agent's prompt.
+    """
+    events = sink()
+    executed, page_text = [], None
+    for index, step in enumerate(steps):
+        try:
+            result = await session.call_tool(step["tool"], step["arguments"])
+            text = "\n".join(content.text for content in result.content if getattr(content, "text", None))
+            ok = not result.isError
+        except Exception as e:
+            text, ok = f"{type(e).__name__}: {e}", False
+        if events.level >= LOG_LEVELS["info"]:
+            events.emit("fast_path_step", label=label, step=index + 1, tool=step["tool"], ok=ok)
+        if not ok:
+            break
+        executed.append(step)
+        if "Page URL:" in text or "```yaml" in text:
+            page_text = text
+    return executed, page_text
+
+
+def fast_path_message(message, executed, page_text):
+    """Prompt for the agent after the leading literal steps were executed directly"""
+    done = "\n".join(f"{index}. {step['step']}" for index, step in enumerate(executed, 1))
+    state = f"\n\nCurrent page state:\n{page_text}" if page_text else ""
+    return (
+        message +
+        "\n\nPROGRESS: The following steps at the start of this test have already been executed in this "
+        "browser session; do not repeat them:\n" + done + state +
+        "\n\nContinue with the next step.\n"
+    )
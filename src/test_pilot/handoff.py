@@ -0,0 +1,276 @@
+"""
+handoff
+
+The handoff JSON for trace-pilot (see "Handoff Contract" in the README),
+written incrementally while the run progresses.
+
+Every agent run (a phase, a two-stage login/main stage or a whole suite) is
+recorded with its UTC start and end time, step and tool-call counts and token
+usage, grouped into one test per suite. Its status is derived from structured
+step outcomes and the verdict line every prompt asks for
+(`VERDICT_INSTRUCTION`), not from the wording of the report:
+
+- error:   the run raised (recursion limit, provider or MCP failure)
+- failed:  the watchdog stopped it, it ended without a final report, the
+           report carries the authentication failure marker or the verdict
+           `RESULT: FAILED`, or it has no verdict and tool calls failed
+- unknown: the report has no verdict and no tool call failed
+- passed:  the report ends with the verdict `RESULT: PASSED`
+
+Page loads measured with `--page-metrics` are attached to their phase and
+summarized per URL under `page_performance`.
+
+The file is rewritten atomically whenever a phase starts or finishes, with
+`test_run_summary.status` "Running" until the run ends ("Completed", or
+"Interrupted" after a crash), so partial results survive and trace-pilot can
+start on the finished time windows early.
+"""
+
+import json
+import os
+import re
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from test_pilot.auth_cache import is_auth_failure
+from test_pilot.events import current_suite, utc_timestamp
+from test_pilot.profiler import percentile
+
+HANDOFF_FILE = "test_report.json"
+VERDICT_INSTRUCTION = (
+    "End your report with a line of its own reading RESULT: PASSED if every step of the test succeeded, "
+    "or RESULT: FAILED otherwise"
+)
+VERDICT_LINE = re.compile(r"^[\s>*_`#-]*RESULT[*_`]*\s*:[\s*_`]*(PASSED|FAILED)\b", re.IGNORECASE | re.MULTILINE)
+
+
+def report_verdict(report):
+    """"passed" or "failed" from the last verdict line of a report, or None without one"""
+    verdicts = VERDICT_LINE.findall(report or "")
+    return verdicts[-1].lower() if verdicts else None
+
+
+def phase_outcome(last_step, tool_errors=0):
+    """`(status, detail)` of an agent run from its last step and its number of failed tool calls"""
+    if not last_step:
+        return "failed", "no response"
+    if "watchdog" in last_step:
+        failure = last_step["watchdog"]
+        return "failed", f"{failure['reason']}: {failure['detail']}"
+    messages = (last_step.get("agent") or {}).get("messages") or []
+    if not messages or getattr(messages[-1], "tool_calls", None):
+        return "failed", "ended without a final report"
+    report = str(messages[-1].content)
+    if is_auth_failure(report):
+        return "failed", "authentication failure"
+    verdict = report_verdict(report)
+    if verdict == "failed":
+        return "failed", "report verdict: FAILED"
+    if verdict is None:
+        # Without a verdict, failed tool calls are the only evidence of the outcome
+        if tool_errors:
+            return "failed", f"no verdict in the report, {tool_errors} tool call(s) failed"
+        return "unknown", "no verdict in the report"
+    return "passed", None
+
+
+def report_failed(report):
+    """True unless the report ends with a passed verdict, as `phase_outcome` judges a run"""
+    return is_auth_failure(report) or report_verdict(report) != "passed"
+
+
+def page_performance(phases):
+    """p50/p95 of the page load metrics of all phases, per URL without query string"""
+    loads = defaultdict(list)
+    for phase in phases:
+        for page in phase.get("page_loads", []):
+            if not page["soft_navigation"]:
+                loads[urlsplit(page["url"])._replace(query="", fragment="").geturl()].append(page)
+    summary = []
+    for url, pages in loads.items():
+        row = {"url": url, "loads": len(pages)}
+        for group, metric in (("web_vitals", "ttfb_ms"), ("web_vitals", "fcp_ms"), ("web_vitals", "lcp_ms"), ("navigation", "load_ms")):
+            values = [page[group][metric] for page in pages if page[group] and page[group][metric] is not None]
+            row[f"p50_{metric}"] = percentile(values, 50)
+            row[f"p95_{metric}"] = percentile(values, 95)
+        row["p50_transfer_bytes"] = percentile([page["resources"]["transfer_bytes"] for page in pages], 50)
+        summary.append(row)
+    return summary
+
+
+class PhaseRecord:
+    """One agent run in the handoff JSON, updated from its steps"""
+
+    def __init__(self, formatter, name):
+        self.formatter = formatter
+        self.started = time.monotonic()
+        self._last_step = self.started
+        # Per-step detail for the run history (see `test_pilot.run_history`), not part of the JSON
+        self.steps = []
+        self.data = {
+            "name": name,
+            "status": "running",
+            "start_time_utc": utc_timestamp(),
+            "end_time_utc": None,
+            "duration_ms": None,
+            "steps": 0,
+            "llm_calls": 0,
+            "tool_calls": 0,
+            "tool_errors": 0,
+            "tokens": {"input": 0, "output": 0, "total": 0},
+            "error": None,
+        }
+
+    def observe(self, step):
+        """Count one `agent.astream` chunk"""
+        now = time.monotonic()
+        self.data["steps"] += 1
+        for node, update in step.items():
+            record = {
+                "step": self.data["steps"],
+                "node": node,
+                "time_utc": utc_timestamp(),
+                "duration_ms": int((now - self._last_step) * 1000),
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "tools": [],
+            }
+            messages = update.get("messages", []) if isinstance(update, dict) else []
+            for message in messages if isinstance(messages, list) else [messages]:
+                if message.type == "ai":
+                    self.data["llm_calls"] += 1
+                    self.data["tool_calls"] += len(getattr(message, "tool_calls", None) or [])
+                    usage = getattr(message, "usage_metadata", None) or {}
+                    for key in ("input", "output", "total"):
+                        self.data["tokens"][key] += usage.get(f"{key}_tokens", 0) or 0
+                    record["input_tokens"] += usage.get("input_tokens", 0) or 0
+                    record["output_tokens"] += usage.get("output_tokens", 0) or 0
+                elif message.type == "tool":
+                    status = getattr(message, "status", "success")
+                    if status == "error":
+                        self.data["tool_errors"] += 1
+                    record["tools"].append((message.name, status))
+            self.steps.append(record)
+        self._last_step = now
+
+    def page_loaded(self, metrics):
+        """Attach the performance metrics of a page load (see `test_pilot.page_metrics`)"""
+        self.data.setdefault("page_loads", []).append(metrics)
+
+    def finish(self, last_step=None, error=None):
+        if error is not None:
+            status, detail = "error", f"{type(error).__name__}: {error}"
+        else:
+            status, detail = phase_outcome(last_step, self.data["tool_errors"])
+        self.data.update(
+            status=status,
+            error=detail,
+            end_time_utc=utc_timestamp(),
+            duration_ms=int((time.monotonic() - self.started) * 1000),
+        )
+        self.formatter.write()
+
+
+class HandoffFormatter:
+    """Collects tests and phases and writes the handoff JSON to `path` (if set)"""
+
+    def __init__(self, path=HANDOFF_FILE):
+        self.path = path
+        self.default_test = "suite"
+        self.suite_hashes = {}
+        self.tests = {}
+        # Set by the post-run regression check (see `test_pilot.regression`)
+        self.regressions = None
+        self.status = "Running"
+        self.start_time = None
+        self.end_time = None
+
+    def start(self, default_test="suite", suite_hashes=None):
+        """Begin the run; `default_test` names phases run outside a named suite.
+
+        `suite_hashes` maps suite names to the content hash of their text, to
+        identify the same suite across runs.
+        """
+        self.default_test = default_test
+        self.suite_hashes = suite_hashes or {}
+        self.start_time = utc_timestamp()
+        self.write()
+
+    def phase_started(self, name):
+        """Record the start of an agent run in the current suite and return its `PhaseRecord`"""
+        test = current_suite.get() or self.default_test
+        record = PhaseRecord(self, name)
+        self.tests.setdefault(test, []).append(record)
+        self.write()
+        return record
+
+    def finish(self, status="Completed"):
+        self.status = status
+        self.end_time = utc_timestamp()
+        self.write()
+
+    def _test(self, name, records):
+        phases = [record.data for record in records]
+        statuses = {phase["status"] for phase in phases}
+        if "running" in statuses:
+            status = "running"
+        elif statuses <= {"passed"}:
+            status = "passed"
+        else:
+            status = "failed"
+        done = status != "running"
+        ended = max(record.started + record.data["duration_ms"] / 1000 for record in records) if done else None
+        return {
+            "name": name,
+            # Fan-out workers ("suite/worker-1") share the hash of their suite
+            "suite_hash": self.suite_hashes.get(name.split("/")[0]),
+            "status": status,
+            "duration_ms": int((ended - records[0].started) * 1000) if done else None,
+            "start_time_utc": phases[0]["start_time_utc"],
+            "end_time_utc": max(phase["end_time_utc"] for phase in phases) if done else None,
+            "phases": phases,
+        }
+
+    def document(self):
+        """The handoff JSON as a dict"""
+        tests = [self._test(name, records) for name, records in self.tests.items()]
+        passed = sum(1 for test in tests if test["status"] == "passed")
+        failed = sum(1 for test in tests if test["status"] == "failed")
+        if self.status == "Running":
+            report = f"Test run in progress. {passed + failed}/{len(tests)} tests finished."
+        else:
+            report = f"Test run {self.status.lower()}. {passed}/{len(tests)} tests passed."
+        document = {
+            "test_run_summary": {
+                "status": self.status,
+                "total_tests": len(tests),
+                "passed": passed,
+                "failed": failed,
+                "report_text": report,
+            },
+            "execution_metadata": {
+                "overall_start_time_utc": self.start_time,
+                "overall_end_time_utc": self.end_time,
+                "updated_time_utc": utc_timestamp(),
+            },
+            "individual_test_results": tests,
+        }
+        pages = page_performance(phase for test in tests for phase in test["phases"])
+        if pages:
+            document["page_performance"] = pages
+        if self.regressions is not None:
+            document["test_run_summary"]["regressions"] = len(self.regressions)
+            if self.regressions:
+                document["test_run_summary"]["report_text"] += f" {len(self.regressions)} performance regression(s) detected."
+            document["regressions"] = self.regressions
+        return document
+
+    def write(self):
+        """Atomically replace the handoff file with the current state"""
+        if not self.path:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.document(), f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.path)
@@ -0,0 +1,145 @@
+"""
+hedging
+
+Hedged and fallback LLM requests across two providers.
+
+A single slow or failing LLM call stalls the whole run, and over 100 steps the
+tail latency of individual calls dominates. `HedgedChatModel` wraps a primary
+and a secondary chat model (each resolved from the ModelForge registry):
+
+- failover: when the primary raises a provider error, a 429 or a 5xx, the
+  request is sent to the secondary instead
+- hedging:  when the primary has not answered within its observed latency
+  percentile (or `hedge_after` seconds until enough calls were seen), the same
+  request is also sent to the secondary and the first answer wins; the other
+  request is cancelled
+
+Tools are bound to both models, so the agent can use the wrapper like any
+chat model. Hedges and failovers are written to the event log and counted in
+`stats`.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field
+
+from test_pilot.events import sink
+from test_pilot.llm_wrapper import INNER_CALL
+from test_pilot.profiler import percentile
+
+FAILOVER_ERRORS = {
+    "ProviderError", "RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError",
+    "ServiceUnavailable", "ResourceExhausted", "DeadlineExceeded", "TimeoutError",
+}
+FAILOVER_STATUS = {408, 429, 500, 502, 503, 504, 529}
+
+
+def is_failover_error(error):
+    """True for errors another provider may not have: provider errors, rate limits, timeouts and 5xx"""
+    if type(error).__name__ in FAILOVER_ERRORS:
+        return True
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status in FAILOVER_STATUS or "429" in str(error)
+
+
+class LatencyTracker:
+    """Recent successful latencies of the primary model, shared by every tool binding"""
+
+    def __init__(self, size=200):
+        self.latencies = deque(maxlen=size)
+        self.stats = {"calls": 0, "hedged": 0, "hedge_wins": 0, "failovers": 0}
+
+    def threshold(self, pct, min_samples, default):
+        if len(self.latencies) < min_samples:
+            return default
+        return percentile(list(self.latencies), pct)
+
+
+class HedgedChatModel(BaseChatModel):
+    primary: Any
+    secondary: Any
+    hedge: bool = True
+    hedge_percentile: float = 95
+    hedge_min_samples: int = 5
+    hedge_after: float = 20.0
+    tracker: Any = Field(default_factory=LatencyTracker)
+
+    @property
+    def _llm_type(self):
+        return "hedged"
+
+    @property
+    def stats(self):
+        return self.tracker.stats
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={
+            "primary": self.primary.bind_tools(tools, **kwargs),
+            "secondary": self.secondary.bind_tools(tools, **kwargs),
+        })
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        try:
+            message = self.primary.invoke(messages, INNER_CALL, stop=stop, **kwargs)
+        except Exception as e:
+            if not is_failover_error(e):
+                raise
+            self._failover(e)
+            message = self.secondary.invoke(messages, INNER_CALL, stop=stop, **kwargs)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _failover(self, error):
+        self.tracker.stats["failovers"] += 1
+        print(f"⚠️  Primary LLM failed ({type(error).__name__}), failing over to the secondary")
+        sink().emit("llm_failover", error=f"{type(error).__name__}: {str(error)[:200]}")
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.tracker.stats["calls"] += 1
+        started = time.monotonic()
+        primary = asyncio.create_task(self.primary.ainvoke(messages, INNER_CALL, stop=stop, **kwargs))
+        delay = self.tracker.threshold(self.hedge_percentile, self.hedge_min_samples, self.hedge_after) if self.hedge else None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                try:
+                    message = primary.result()
+                except Exception as e:
+                    if not is_failover_error(e):
+                        raise
+                    self._failover(e)
+                    message = await self.secondary.ainvoke(messages, INNER_CALL, stop=stop, **kwargs)
+                else:
+                    self.tracker.latencies.append(time.monotonic() - started)
+                return ChatResult(generations=[ChatGeneration(message=message)])
+            message = await self._hedged(primary, messages, stop, delay, started, **kwargs)
+            return ChatResult(generations=[ChatGeneration(message=message)])
+        finally:
+            if not primary.done():
+                primary.cancel()
+
+    async def _hedged(self, primary, messages, stop, delay, started, **kwargs):
+        """Race the still running primary against a secondary request; the first success wins"""
+        self.tracker.stats["hedged"] += 1
+        sink().emit("llm_hedge", after_ms=int(delay * 1000))
+        secondary = asyncio.create_task(self.secondary.ainvoke(messages, INNER_CALL, stop=stop, **kwargs))
+        pending, error = {primary, secondary}, None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is secondary:
+                            self.tracker.stats["hedge_wins"] += 1
+                        else:
+                            self.tracker.latencies.append(time.monotonic() - started)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            if not secondary.done():
+                secondary.cancel()
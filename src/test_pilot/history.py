@@ -0,0 +1,140 @@
+"""
+history
+
+Conversation history policies that bound the prompt size per step.
+
+The ReAct message list only grows: with `recursion_limit=100` late steps
+resend every earlier tool exchange. A policy rewrites what the LLM sees (in
+the `pre_model_hook`, the stored conversation is untouched), always keeping
+the system prompt and the suite text plus the last `keep` exchanges verbatim:
+
+- full:     send the whole history (the previous behavior)
+- window:   drop older exchanges, leaving a one-line note of what was dropped
+- summary:  roll older exchanges into a compact running summary, one line per
+            tool call with its arguments and the outcome (page URL or first line)
+- truncate: keep older exchanges but cut their large tool outputs
+
+An exchange is an AI message together with the tool results answering its
+tool calls, so tool calls are never separated from their results.
+`PromptSizeLogger` writes the size of every prompt actually sent to the event
+log, so the effect of a policy is visible per step.
+"""
+
+import json
+from collections import Counter
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from test_pilot.compaction import PAGE_LINE
+from test_pilot.events import LOG_LEVELS, sink
+from test_pilot.tool_middleware import result_text
+
+HISTORY_POLICIES = ("full", "window", "summary", "truncate")
+
+
+def _text(message):
+    return result_text((message.content,)) if isinstance(message.content, list) else str(message.content)
+
+
+def split_history(messages):
+    """Split into `(head, exchanges)`: leading system messages plus the first user message, then exchanges"""
+    start = 0
+    while start < len(messages) and isinstance(messages[start], SystemMessage):
+        start += 1
+    if start < len(messages) and isinstance(messages[start], HumanMessage):
+        start += 1
+    head, exchanges = messages[:start], []
+    for message in messages[start:]:
+        if isinstance(message, ToolMessage) and exchanges:
+            exchanges[-1].append(message)
+        else:
+            exchanges.append([message])
+    return head, exchanges
+
+
+def _outcome(message):
+    text = _text(message)
+    pages = PAGE_LINE.findall(text)
+    if pages:
+        return pages[0].lstrip("- ").strip()
+    first = next((line.strip() for line in text.splitlines() if line.strip() and not line.startswith("#")), "")
+    return first[:120]
+
+
+def summarize_exchange(exchange):
+    """One line per tool call (or message) of an exchange"""
+    first = exchange[0]
+    if isinstance(first, AIMessage) and first.tool_calls:
+        results = {message.tool_call_id: message for message in exchange[1:]}
+        lines = []
+        for call in first.tool_calls:
+            args = json.dumps(call["args"], ensure_ascii=False, default=str)
+            result = results.get(call["id"])
+            if result is None:
+                outcome = "no result"
+            else:
+                outcome = ("ERROR " if getattr(result, "status", "success") == "error" else "") + _outcome(result)
+            lines.append(f"- {call['name']}({args[:160]}) → {outcome}")
+        return lines
+    role = "assistant" if isinstance(first, AIMessage) else "user"
+    return [f"- {role}: {_text(first).strip()[:160]}"]
+
+
+def _truncate(message, max_chars):
+    text = _text(message)
+    if len(text) <= max_chars:
+        return message
+    return ToolMessage(
+        content=f"{text[:max_chars]}\n[... {len(text) - max_chars} more characters of tool output omitted]",
+        tool_call_id=message.tool_call_id,
+        name=message.name,
+        id=message.id,
+        status=message.status,
+    )
+
+
+def apply_history_policy(messages, policy="full", keep=6, max_chars=2000):
+    """Messages to send to the LLM under `policy`, keeping the last `keep` exchanges verbatim"""
+    if policy == "full":
+        return messages
+    if policy not in HISTORY_POLICIES:
+        raise ValueError(f"Unknown history policy '{policy}', expected one of {list(HISTORY_POLICIES)}")
+    head, exchanges = split_history(messages)
+    if len(exchanges) <= keep:
+        return messages
+    older, recent = exchanges[:len(exchanges) - keep], exchanges[len(exchanges) - keep:]
+    if policy == "truncate":
+        older = [[_truncate(message, max_chars) if isinstance(message, ToolMessage) else message for message in exchange] for exchange in older]
+        return head + [message for exchange in older + recent for message in exchange]
+    if policy == "window":
+        tools = Counter(call["name"] for exchange in older for call in getattr(exchange[0], "tool_calls", None) or [])
+        called = ", ".join(f"{name} ×{count}" for name, count in tools.most_common()) or "no tools"
+        note = f"[{len(older)} earlier steps omitted from the history ({called}). Continue from the current page state.]"
+    else:
+        lines = [line for exchange in older for line in summarize_exchange(exchange)]
+        note = "Summary of the earlier steps (oldest first):\n" + "\n".join(lines)
+    return head + [HumanMessage(content=note)] + [message for exchange in recent for message in exchange]
+
+
+class PromptSizeLogger(AsyncCallbackHandler):
+    """Writes a `prompt` event with the message count and size of every LLM request"""
+
+    def __init__(self, label):
+        self.label = label
+        self.calls = 0
+
+    async def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.calls += 1
+        if sink().level < LOG_LEVELS["info"]:
+            return
+        for batch in messages:
+            chars = sum(len(_text(message)) for message in batch)
+            sink().emit(
+                "prompt",
+                label=self.label,
+                call=self.calls,
+                messages=len(batch),
+                chars=chars,
+                est_tokens=chars // 4,
+            )
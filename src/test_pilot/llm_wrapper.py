@@ -0,0 +1,13 @@
+"""
+llm_wrapper
+
+Shared by the chat models that wrap other chat models (hedging, rate limiting,
+routing).
+
+The wrapper's own run already reports to the callbacks of the agent (prompt
+size logger, profiler), so calls to the wrapped models are made with
+`INNER_CALL` and report to none; otherwise every LLM step would be logged and
+profiled twice.
+"""
+
+INNER_CALL = {"callbacks": []}
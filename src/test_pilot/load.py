@@ -0,0 +1,238 @@
+"""
+load
+
+Virtual-user load generation.
+
+`run_load` drives a number of virtual users through repeated iterations of a
+suite following a ramp-up / steady / ramp-down profile: users start evenly
+spread over the ramp-up, all of them run through the steady period, and they
+stop in reverse start order over the ramp-down. Between iterations each user
+pauses for a think time drawn from a configurable distribution. An iteration
+is any coroutine returning per-phase results (see `test_pilot.suite`), and
+every user runs in its own browser session. The run is summarized as target
+vs. achieved concurrency over time and a latency histogram per phase.
+"""
+
+import asyncio
+import random
+import re
+import time
+from dataclasses import dataclass, field
+
+from test_pilot.events import current_suite
+from test_pilot.profiler import percentile
+
+HISTOGRAM_BUCKETS_MS = [500, 1000, 2000, 5000, 10000, 20000, 30000, 60000, 120000, 300000]
+THINK_TIME = re.compile(r"^(none|const|uniform|exp|normal)(?::([\d.]+)(?:-([\d.]+))?)?$")
+
+
+@dataclass
+class LoadProfile:
+    """Number of virtual users and the ramp-up, steady and ramp-down durations in seconds"""
+    users: int
+    ramp_up: float = 0
+    steady: float = 60
+    ramp_down: float = 0
+
+    @property
+    def duration(self):
+        return self.ramp_up + self.steady + self.ramp_down
+
+    def start_offset(self, user):
+        """Seconds after the start at which `user` (0-based) begins its first iteration"""
+        return self.ramp_up * user / self.users
+
+    def stop_offset(self, user):
+        """Seconds after the start after which `user` begins no new iteration"""
+        return self.ramp_up + self.steady + self.ramp_down * (self.users - 1 - user) / self.users
+
+    def target(self, elapsed):
+        """Number of users the profile asks for `elapsed` seconds into the run"""
+        return sum(
+            1 for user in range(self.users)
+            if self.start_offset(user) <= elapsed < self.stop_offset(user)
+        )
+
+
+@dataclass
+class ThinkTime:
+    """Pause between iterations: none, const:S, uniform:A-B, exp:MEAN or normal:MEAN-STDDEV (seconds)"""
+    kind: str = "none"
+    a: float = 0
+    b: float = 0
+
+    @classmethod
+    def parse(cls, spec):
+        match = THINK_TIME.match((spec or "none").strip())
+        if not match:
+            raise ValueError(f"Invalid think time {spec!r}, expected none, const:S, uniform:A-B, exp:MEAN or normal:MEAN-STDDEV")
+        kind, a, b = match.groups()
+        if kind != "none" and a is None:
+            raise ValueError(f"Think time {spec!r} needs a value")
+        a = float(a or 0)
+        if b is not None:
+            b = float(b)
+        else:
+            # normal:MEAN defaults to a standard deviation of a quarter of the mean
+            b = a / 4 if kind == "normal" else a
+        return cls(kind, a, b)
+
+    def sample(self, rng):
+        if self.kind == "const":
+            return self.a
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b)
+        if self.kind == "exp":
+            return rng.expovariate(1 / self.a) if self.a > 0 else 0
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(self.a, self.b))
+        return 0.0
+
+
+@dataclass
+class LoadStats:
+    profile: LoadProfile
+    started: float = field(default_factory=time.monotonic)
+    active: int = 0
+    samples: list = field(default_factory=list)
+    iterations: list = field(default_factory=list)
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def sample(self):
+        elapsed = self.elapsed()
+        self.samples.append({"t": round(elapsed, 1), "target": self.profile.target(elapsed), "active": self.active})
+
+
+async def _sampler(stats, interval):
+    while True:
+        stats.sample()
+        await asyncio.sleep(interval)
+
+
+async def run_load(profile, run_iteration, think_time=None, seed=None, sample_interval=1.0):
+    """Run virtual users following `profile` and return the collected `LoadStats`.
+
+    `run_iteration(user, iteration)` runs one pass over the suite for a user
+    and returns a list of result dicts with `name`, `status` and
+    `duration_ms`, one per phase. A failing iteration never stops the user.
+    """
+    think_time = think_time or ThinkTime()
+    stats = LoadStats(profile)
+    sampler = asyncio.create_task(_sampler(stats, sample_interval))
+    suite = current_suite.get()
+
+    async def virtual_user(user):
+        name = f"vu-{user + 1}"
+        current_suite.set(f"{suite}/{name}" if suite else name)
+        rng = random.Random(None if seed is None else seed + user)
+        await asyncio.sleep(profile.start_offset(user))
+        iteration = 0
+        while stats.elapsed() < profile.stop_offset(user):
+            iteration += 1
+            stats.active += 1
+            started = time.monotonic()
+            try:
+                phases = await run_iteration(user, iteration)
+                error = None
+            except Exception as e:
+                phases, error = [], f"{type(e).__name__}: {e}"
+                print(f"❌ {name} iteration {iteration} failed: {error}")
+            finally:
+                stats.active -= 1
+            failed = error is not None or any(phase["status"] in ("failed", "error") for phase in phases)
+            stats.iterations.append({
+                "user": user + 1,
+                "iteration": iteration,
+                "status": "failed" if failed else "passed",
+                "error": error,
+                "duration_ms": int((time.monotonic() - started) * 1000),
+                "phases": [{key: phase.get(key) for key in ("name", "status", "duration_ms")} for phase in phases],
+            })
+            pause = think_time.sample(rng)
+            remaining = profile.stop_offset(user) - stats.elapsed()
+            if pause and remaining > 0:
+                await asyncio.sleep(min(pause, remaining))
+
+    try:
+        await asyncio.gather(*(virtual_user(user) for user in range(profile.users)))
+    finally:
+        sampler.cancel()
+        stats.sample()
+    return stats
+
+
+def histogram(durations_ms, buckets=HISTOGRAM_BUCKETS_MS):
+    """Counts of durations per `<= bucket` boundary, with a final overflow bucket"""
+    counts = [0] * (len(buckets) + 1)
+    for duration in durations_ms:
+        index = next((i for i, bound in enumerate(buckets) if duration <= bound), len(buckets))
+        counts[index] += 1
+    return counts
+
+
+def _bucket_label(index, buckets):
+    if index == len(buckets):
+        return f"> {buckets[-1] / 1000:g}s"
+    return f"≤ {buckets[index] / 1000:g}s"
+
+
+def load_report(stats):
+    """Markdown summary of a load run: throughput, concurrency and per-phase latency histograms"""
+    profile = stats.profile
+    iterations = stats.iterations
+    passed = sum(1 for item in iterations if item["status"] == "passed")
+    elapsed = max(stats.elapsed(), 1e-9)
+    active = [sample["active"] for sample in stats.samples]
+    steady = [
+        sample["active"] for sample in stats.samples
+        if profile.ramp_up <= sample["t"] < profile.ramp_up + profile.steady
+    ]
+    lines = [
+        "# Load Test Report",
+        "",
+        f"Profile: {profile.users} users, ramp-up {profile.ramp_up:g}s, steady {profile.steady:g}s, ramp-down {profile.ramp_down:g}s",
+        "",
+        "| Metric | Value |",
+        "|--------|-------|",
+        f"| Iterations | {len(iterations)} ({passed} passed, {len(iterations) - passed} failed) |",
+        f"| Throughput | {len(iterations) / elapsed * 60:.2f} iterations/min |",
+        f"| Duration | {elapsed:.1f}s |",
+        f"| Peak concurrency | {max(active, default=0)} of {profile.users} |",
+        f"| Mean steady-state concurrency | {sum(steady) / len(steady) if steady else 0:.2f} |",
+    ]
+
+    phases = {}
+    for item in iterations:
+        for phase in item["phases"]:
+            if phase.get("duration_ms") is not None and phase["status"] != "skipped":
+                phases.setdefault(phase["name"], []).append(phase["duration_ms"])
+    if phases:
+        lines.extend([
+            "",
+            "## Phase Latency",
+            "",
+            "| Phase | Count | p50 (ms) | p95 (ms) | p99 (ms) | Max (ms) |",
+            "|-------|-------|----------|----------|----------|----------|",
+        ])
+        for name, durations in phases.items():
+            lines.append(
+                f"| {name} | {len(durations)} | {percentile(durations, 50)} | {percentile(durations, 95)} "
+                f"| {percentile(durations, 99)} | {max(durations)} |"
+            )
+        for name, durations in phases.items():
+            counts = histogram(durations)
+            widest = max(counts)
+            lines.extend(["", f"### {name}", "", "```"])
+            for index, count in enumerate(counts):
+                if count:
+                    bar = "#" * max(1, round(40 * count / widest))
+                    lines.append(f"{_bucket_label(index, HISTOGRAM_BUCKETS_MS):>8} | {bar} {count}")
+            lines.append("```")
+
+    lines.extend(["", "## Concurrency", "", "| t (s) | Target | Active |", "|-------|--------|--------|"])
+    step = max(1, len(stats.samples) // 30)
+    for sample in stats.samples[::step]:
+        lines.append(f"| {sample['t']} | {sample['target']} | {sample['active']} |")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,193 @@
+"""
+mcp_pool
+
+Warm pool of Playwright MCP server sessions.
+
+Every run used to spawn a fresh `npx @playwright/mcp` subprocess, initialize the
+MCP session, rediscover the tools and kill the process again. On CI that cold
+start (npx resolution, node boot, chromium launch) dominates short suites. The
+pool keeps pre-initialized sessions alive, hands them out per suite, resets the
+browser state on return, health-checks them on checkout and recycles each
+process after a configurable number of uses.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from test_pilot.tool_catalog import load_tools
+
+PLAYWRIGHT_MCP_ARGS = ["@playwright/mcp", "--browser", "chromium", "--viewport-size", "1920,1080"]
+
+
+def playwright_server_params(headless=True, storage_file=None, isolated=False, user_data_dir=None):
+    """Build the stdio parameters for a Playwright MCP server"""
+    args = list(PLAYWRIGHT_MCP_ARGS)
+    if headless:
+        args.append("--headless")
+    if isolated:
+        args.append("--isolated")
+    elif user_data_dir:
+        args.extend(["--user-data-dir", user_data_dir])
+    if storage_file:
+        args.extend(["--storage-state", storage_file])
+    return StdioServerParameters(command="npx", args=args)
+
+
+def _pool_key(server_params):
+    return (server_params.command, tuple(server_params.args))
+
+
+class WarmSession:
+    """A running MCP server process with its initialized session and tools.
+
+    The stdio transport uses anyio task groups, which must be entered and exited
+    from the same task, so each warm session is owned by a dedicated task that
+    keeps the transport open until `close()` is called.
+    """
+
+    def __init__(self, server_params):
+        self.server_params = server_params
+        self.session = None
+        self.tools = None
+        self.uses = 0
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._task = None
+        self._error = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._serve())
+        await self._ready.wait()
+        if self._error:
+            raise self._error
+        return self
+
+    async def _serve(self):
+        try:
+            async with stdio_client(self.server_params) as (read, write):
+                async with ClientSession(read, write) as session:
+                    init_result = await session.initialize()
+                    self.tools = await load_tools(session, init_result, self.server_params)
+                    self.session = session
+                    self._ready.set()
+                    await self._closing.wait()
+        except Exception as e:
+            self._error = e
+        finally:
+            self.session = None
+            self._ready.set()
+
+    @property
+    def alive(self):
+        return self.session is not None and not self._closing.is_set()
+
+    async def ping(self, timeout):
+        """Return True if the server still answers within `timeout` seconds"""
+        if not self.alive:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout)
+            return True
+        except Exception:
+            return False
+
+    async def close(self):
+        self._closing.set()
+        if self._task:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+class McpSessionPool:
+    """Keeps up to `size` warm MCP sessions per server configuration.
+
+    Sessions are checked out with `acquire(server_params)`. On return the
+    browser state is reset by calling `reset_tool`, and a process is recycled
+    once it has served `max_uses` suites or fails a health check. Servers
+    should be started with `--isolated` (see `playwright_server_params`) so the
+    reset yields a fresh context that reloads any `--storage-state` file.
+    """
+
+    def __init__(self, size=2, max_uses=20, health_timeout=10, reset_tool="browser_close"):
+        self.size = size
+        self.max_uses = max_uses
+        self.health_timeout = health_timeout
+        self.reset_tool = reset_tool
+        self._idle = {}
+        self._sessions = set()
+        self._lock = asyncio.Lock()
+        self.stats = {"spawned": 0, "reused": 0, "recycled": 0, "unhealthy": 0}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _spawn(self, server_params):
+        warm = await WarmSession(server_params).start()
+        self._sessions.add(warm)
+        self.stats["spawned"] += 1
+        return warm
+
+    async def _retire(self, warm):
+        self._sessions.discard(warm)
+        await warm.close()
+
+    async def warm(self, server_params, count=None):
+        """Pre-start sessions for `server_params` until `count` (default: size) are idle"""
+        count = self.size if count is None else count
+        idle = self._idle.setdefault(_pool_key(server_params), [])
+        missing = max(0, count - len(idle))
+        if missing:
+            started = await asyncio.gather(*(self._spawn(server_params) for _ in range(missing)))
+            idle.extend(started)
+            print(f"✅ MCP pool: {len(idle)} warm session(s) ready")
+
+    async def _checkout(self, server_params):
+        idle = self._idle.setdefault(_pool_key(server_params), [])
+        while True:
+            async with self._lock:
+                warm = idle.pop() if idle else None
+            if warm is None:
+                return await self._spawn(server_params)
+            if await warm.ping(self.health_timeout):
+                self.stats["reused"] += 1
+                return warm
+            self.stats["unhealthy"] += 1
+            print("⚠️  MCP pool: dropping unresponsive session")
+            await self._retire(warm)
+
+    async def _checkin(self, warm):
+        warm.uses += 1
+        idle = self._idle.setdefault(_pool_key(warm.server_params), [])
+        if warm.uses >= self.max_uses or len(idle) >= self.size or not warm.alive:
+            self.stats["recycled"] += 1
+            await self._retire(warm)
+            return
+        try:
+            await asyncio.wait_for(warm.session.call_tool(self.reset_tool, {}), self.health_timeout)
+        except Exception as e:
+            print(f"⚠️  MCP pool: reset failed ({e}), recycling session")
+            self.stats["recycled"] += 1
+            await self._retire(warm)
+            return
+        async with self._lock:
+            idle.append(warm)
+
+    @asynccontextmanager
+    async def acquire(self, server_params):
+        """Yield `(session, tools)` from a warm server matching `server_params`"""
+        warm = await self._checkout(server_params)
+        try:
+            yield warm.session, warm.tools
+        finally:
+            await self._checkin(warm)
+
+    async def close(self):
+        sessions = list(self._sessions)
+        self._idle.clear()
+        self._sessions.clear()
+        await asyncio.gather(*(warm.close() for warm in sessions), return_exceptions=True)
@@ -0,0 +1,153 @@
+"""
+page_metrics
+
+Page-load performance metrics collected through the Playwright MCP session.
+
+`PageMetrics` is a tool middleware: whenever a tool result shows a new page
+URL (a `browser_navigate`, or a click that led to another page), it runs
+`COLLECT_FUNCTION` through `browser_evaluate` directly on the MCP session, so
+the LLM neither asks for nor sees it. Each page load yields:
+
+- navigation:  Navigation Timing of the document (DNS, connect, TTFB,
+               DOMContentLoaded, load, transfer size)
+- resources:   count and transferred/encoded bytes of the resources loaded,
+               by initiator type
+- web_vitals:  TTFB, FCP, LCP and CLS
+
+A URL change within the same document (client-side routing) is recorded as a
+soft navigation without Navigation Timing, with only the resources loaded
+since the previous page. The page loads are written to the event log and
+passed to `on_page`, which attaches them to the phase in the handoff JSON.
+"""
+
+import json
+import re
+
+from test_pilot.compaction import PAGE_LINE
+from test_pilot.events import sink
+from test_pilot.tool_middleware import result_text
+
+EVALUATE_TOOL = "browser_evaluate"
+RESULT_BLOCK = re.compile(r"(?:### Result|- Result:)\s*\n?(.+?)(?:\n\n|\n###|\Z)", re.DOTALL)
+
+# Returns a Promise; browser_evaluate awaits it. __ORIGIN__ and __SINCE__ are
+# replaced with the document (time origin) and performance.now() of the
+# previous collection, so a soft navigation only counts the newer resources.
+COLLECT_FUNCTION = """async () => {
+  const since = performance.timeOrigin === __ORIGIN__ ? __SINCE__ : 0;
+  const buffered = (type) => new Promise((resolve) => {
+    const entries = [];
+    try {
+      const observer = new PerformanceObserver((list) => entries.push(...list.getEntries()));
+      observer.observe({ type, buffered: true });
+      setTimeout(() => { observer.disconnect(); resolve(entries); }, 50);
+    } catch (e) {
+      resolve(entries);
+    }
+  });
+  const [lcp, shifts] = await Promise.all([buffered("largest-contentful-paint"), buffered("layout-shift")]);
+  const round = (value) => (value === undefined || value === null ? null : Math.round(value));
+  const nav = performance.getEntriesByType("navigation")[0];
+  const fcp = performance.getEntriesByType("paint").find((entry) => entry.name === "first-contentful-paint");
+  const resources = { count: 0, transfer_bytes: 0, encoded_bytes: 0, by_type: {} };
+  for (const entry of performance.getEntriesByType("resource")) {
+    if (entry.startTime < since) continue;
+    resources.count += 1;
+    resources.transfer_bytes += entry.transferSize || 0;
+    resources.encoded_bytes += entry.encodedBodySize || 0;
+    resources.by_type[entry.initiatorType] = (resources.by_type[entry.initiatorType] || 0) + 1;
+  }
+  return {
+    url: location.href,
+    time_origin: performance.timeOrigin,
+    now: performance.now(),
+    navigation: nav ? {
+      type: nav.type,
+      dns_ms: round(nav.domainLookupEnd - nav.domainLookupStart),
+      connect_ms: round(nav.connectEnd - nav.connectStart),
+      ttfb_ms: round(nav.responseStart - nav.startTime),
+      response_ms: round(nav.responseEnd - nav.responseStart),
+      dom_interactive_ms: round(nav.domInteractive),
+      dom_content_loaded_ms: round(nav.domContentLoadedEventEnd),
+      load_ms: round(nav.loadEventEnd) || null,
+      transfer_bytes: nav.transferSize,
+    } : null,
+    resources,
+    web_vitals: {
+      ttfb_ms: nav ? round(nav.responseStart - nav.startTime) : null,
+      fcp_ms: fcp ? round(fcp.startTime) : null,
+      lcp_ms: lcp.length ? round(lcp[lcp.length - 1].startTime) : null,
+      cls: Math.round(shifts.filter((entry) => !entry.hadRecentInput).reduce((sum, entry) => sum + entry.value, 0) * 1000) / 1000,
+    },
+  };
+}"""
+
+
+def page_url(text):
+    """The page URL a tool result shows, or None"""
+    for line in PAGE_LINE.findall(text):
+        if "Page URL:" in line:
+            return line.split("Page URL:", 1)[1].strip()
+    return None
+
+
+def parse_evaluate_result(text):
+    """The JSON value returned by `browser_evaluate`, or None"""
+    match = RESULT_BLOCK.search(text)
+    if not match:
+        return None
+    try:
+        value = json.loads(match.group(1).strip())
+        # Some versions return the value serialized twice
+        return json.loads(value) if isinstance(value, str) else value
+    except json.JSONDecodeError:
+        return None
+
+
+class PageMetrics:
+    """Tool middleware collecting performance metrics for every page load of a session"""
+
+    def __init__(self, session, label, on_page=None):
+        self.session = session
+        self.label = label
+        self.on_page = on_page
+        self._url = None
+        self._document = None
+        self._since = 0
+
+    async def __call__(self, tool_name, arguments, call_next):
+        result = await call_next(arguments)
+        await self.observe(result_text(result))
+        return result
+
+    async def observe(self, text):
+        """Capture the metrics if the tool result `text` shows a page other than the last one"""
+        url = page_url(text)
+        if url and url != self._url:
+            self._url = url
+            await self.capture()
+
+    async def capture(self):
+        """Collect the metrics of the current page; never fails the tool call that triggered it"""
+        try:
+            function = COLLECT_FUNCTION.replace("__ORIGIN__", json.dumps(self._document)).replace("__SINCE__", str(self._since))
+            result = await self.session.call_tool(EVALUATE_TOOL, {"function": function})
+            text = "\n".join(content.text for content in result.content if getattr(content, "text", None))
+            metrics = None if result.isError else parse_evaluate_result(text)
+        except Exception as e:
+            print(f"⚠️  {self.label}: page metrics not collected ({type(e).__name__}: {e})")
+            return None
+        if not isinstance(metrics, dict) or "url" not in metrics:
+            return None
+        document = metrics.pop("time_origin", None)
+        soft = self._document is not None and document == self._document
+        if soft:
+            # Navigation Timing and web vitals still describe the initial load of the document
+            metrics["navigation"] = metrics["web_vitals"] = None
+        metrics["soft_navigation"] = soft
+        self._document = document
+        self._since = metrics.pop("now", 0)
+        sink().emit("page_metrics", label=self.label, **metrics)
+        if self.on_page:
+            self.on_page(metrics)
+        return metrics
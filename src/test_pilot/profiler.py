@@ -0,0 +1,177 @@
+"""
+profiler
+
+Per-step latency profiling that separates LLM time from browser time.
+
+`Profiler` records a span for every LLM invocation (through a LangChain
+callback handler) and for every MCP tool call (through a tool middleware),
+with wall time, payload sizes and token counts. The spans are exported as a
+Chrome trace-event JSON file, viewable in Perfetto or chrome://tracing with one
+lane per suite/phase, and summarized as a p50/p95 table per tool.
+"""
+
+import json
+import math
+import os
+import time
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+
+from test_pilot.events import current_suite
+from test_pilot.tool_middleware import result_text
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of `values` (None when empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _lane(label):
+    suite = current_suite.get()
+    return f"{suite}/{label}" if suite else label
+
+
+def _message_chars(messages):
+    return sum(len(str(message.content)) for message in messages)
+
+
+class _LlmTimer(AsyncCallbackHandler):
+    def __init__(self, profiler, label):
+        self.profiler = profiler
+        self.label = label
+        self._started = {}
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        self._started[run_id] = (time.perf_counter(), sum(_message_chars(batch) for batch in messages))
+
+    async def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        started, prompt_chars = self._started.pop(run_id, (None, 0))
+        if started is None:
+            return
+        usage = {}
+        generations = [generation for batch in response.generations for generation in batch]
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            if message is not None and getattr(message, "usage_metadata", None):
+                usage = dict(message.usage_metadata)
+        self.profiler.span(
+            "llm", "llm", self.label, started, time.perf_counter(),
+            prompt_chars=prompt_chars,
+            input_tokens=usage.get("input_tokens"),
+            output_tokens=usage.get("output_tokens"),
+        )
+
+    async def on_llm_error(self, error, *, run_id: UUID, **kwargs):
+        started, prompt_chars = self._started.pop(run_id, (None, 0))
+        if started is not None:
+            self.profiler.span("llm", "llm", self.label, started, time.perf_counter(), prompt_chars=prompt_chars, error=str(error))
+
+
+class _ToolTimer:
+    def __init__(self, profiler, label):
+        self.profiler = profiler
+        self.label = label
+
+    async def __call__(self, tool_name, arguments, call_next):
+        started = time.perf_counter()
+        try:
+            result = await call_next(arguments)
+        except Exception as e:
+            self.profiler.span(tool_name, "tool", self.label, started, time.perf_counter(), error=str(e)[:200])
+            raise
+        self.profiler.span(
+            tool_name, "tool", self.label, started, time.perf_counter(),
+            args_chars=len(json.dumps(arguments, default=str)),
+            result_chars=len(result_text(result)),
+        )
+        return result
+
+
+class Profiler:
+    """Collects LLM and tool spans for the whole process"""
+
+    def __init__(self):
+        self.spans = []
+        self._origin = time.perf_counter()
+        self._lanes = {}
+
+    def span(self, name, category, label, started, ended, **details):
+        self.spans.append({
+            "name": name,
+            "category": category,
+            "label": label,
+            "start_us": int((started - self._origin) * 1e6),
+            "dur_us": int((ended - started) * 1e6),
+            "args": {key: value for key, value in details.items() if value is not None},
+        })
+
+    def llm_callback(self, label):
+        """LangChain callback handler timing LLM invocations for `label`"""
+        return _LlmTimer(self, _lane(label))
+
+    def tool_middleware(self, label):
+        """Tool middleware timing MCP calls for `label`"""
+        return _ToolTimer(self, _lane(label))
+
+    def chrome_trace(self):
+        events = []
+        for span in self.spans:
+            lane = self._lanes.setdefault(span["label"], len(self._lanes) + 1)
+            events.append({
+                "name": span["name"],
+                "cat": span["category"],
+                "ph": "X",
+                "ts": span["start_us"],
+                "dur": span["dur_us"],
+                "pid": 1,
+                "tid": lane,
+                "args": span["args"],
+            })
+        events.extend(
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": lane, "args": {"name": label}}
+            for label, lane in self._lanes.items()
+        )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+        print(f"✅ Profile trace ({len(self.spans)} spans) saved to {path} (open in https://ui.perfetto.dev)")
+
+    def summary(self):
+        """Rows of count, total, p50 and p95 milliseconds per LLM/tool name"""
+        groups = {}
+        for span in self.spans:
+            key = "LLM" if span["category"] == "llm" else span["name"]
+            groups.setdefault(key, []).append(span)
+        rows = []
+        for name, spans in groups.items():
+            durations = [span["dur_us"] / 1000 for span in spans]
+            rows.append({
+                "name": name,
+                "count": len(spans),
+                "total_ms": round(sum(durations), 1),
+                "p50_ms": round(percentile(durations, 50), 1),
+                "p95_ms": round(percentile(durations, 95), 1),
+                "tokens": sum((span["args"].get("input_tokens") or 0) + (span["args"].get("output_tokens") or 0) for span in spans),
+            })
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+    def summary_table(self):
+        lines = [
+            "| Step | Count | Total (ms) | p50 (ms) | p95 (ms) | Tokens |",
+            "|------|-------|------------|----------|----------|--------|",
+        ]
+        lines.extend(
+            f"| {row['name']} | {row['count']} | {row['total_ms']} | {row['p50_ms']} | {row['p95_ms']} | {row['tokens']} |"
+            for row in self.summary()
+        )
+        return "\n".join(lines)
@@ -0,0 +1,113 @@
+"""
+publish
+
+Live NDJSON event stream for downstream analyzers such as trace-pilot.
+
+With `--publish TARGET` the run and phase lifecycle events and the per-step
+events are written, as they happen, to one of:
+
+- unix:PATH       a Unix domain stream socket the analyzer listens on
+- tcp:HOST:PORT   a TCP socket the analyzer listens on
+- fifo:PATH       a named pipe (created if missing); also any existing FIFO path
+- PATH            an append-only file the analyzer tails
+
+Each line is the same JSON object as in the event log, with its UTC `ts`.
+Publishing never blocks or fails the run: while the analyzer is not
+connected (or cannot keep up) events are dropped and counted, and the
+connection is retried at most once per `retry_interval` seconds.
+"""
+
+import errno
+import os
+import socket
+import stat
+import time
+
+# Events sent to the publish target, in addition to being logged
+PUBLISHED_EVENTS = {"run_started", "run_finished", "phase_started", "phase_finished", "step", "agent_stalled"}
+
+
+class Publisher:
+    def __init__(self, target, retry_interval=1.0, timeout=0.5):
+        self.target = target
+        self.retry_interval = retry_interval
+        self.timeout = timeout
+        self.published = 0
+        self.dropped = 0
+        self._conn = None
+        self._last_attempt = None
+        self._warned = False
+        self._partial = False
+        if target.startswith("fifo:") and not os.path.exists(target[len("fifo:"):]):
+            os.mkfifo(target[len("fifo:"):])
+
+    def _connect(self):
+        target = self.target
+        if target.startswith("unix:"):
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            conn.settimeout(self.timeout)
+            conn.connect(target[len("unix:"):])
+            return conn
+        if target.startswith("tcp:"):
+            host, port = target[len("tcp:"):].rsplit(":", 1)
+            return socket.create_connection((host, int(port)), timeout=self.timeout)
+        path = target[len("fifo:"):] if target.startswith("fifo:") else target
+        if os.path.exists(path) and stat.S_ISFIFO(os.stat(path).st_mode):
+            # Non-blocking, so a pipe without a reader (ENXIO) or a full pipe never stalls the run
+            return os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+        return open(path, "a", encoding="utf-8")
+
+    def _write(self, line):
+        if self._partial:
+            # Terminate the line cut off by the previous failure
+            line = "\n" + line
+        self._partial = True
+        if isinstance(self._conn, socket.socket):
+            self._conn.sendall(line.encode("utf-8"))
+        elif isinstance(self._conn, int):
+            data = line.encode("utf-8")
+            if os.write(self._conn, data) < len(data):
+                raise BlockingIOError(errno.EAGAIN, "pipe is full")
+        else:
+            self._conn.write(line)
+            self._conn.flush()
+        self._partial = False
+
+    def publish(self, line):
+        """Send one NDJSON line, or drop it while the target is unavailable"""
+        if self._conn is None:
+            now = time.monotonic()
+            if self._last_attempt is not None and now - self._last_attempt < self.retry_interval:
+                self.dropped += 1
+                return
+            self._last_attempt = now
+            try:
+                self._conn = self._connect()
+            except OSError as e:
+                self._unavailable(e)
+                return
+        try:
+            self._write(line)
+            self.published += 1
+        except OSError as e:
+            self._unavailable(e)
+            self.close()
+
+    def _unavailable(self, error):
+        self.dropped += 1
+        if not self._warned:
+            reason = "no reader" if error.errno == errno.ENXIO else f"{type(error).__name__}: {error}"
+            print(f"⚠️  Publish target {self.target} unavailable ({reason}), dropping events until it is")
+            self._warned = True
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            if isinstance(conn, int):
+                os.close(conn)
+            else:
+                conn.close()
+        except OSError:
+            pass
@@ -0,0 +1,285 @@
+"""
+rate_limit
+
+Token-bucket rate limiting of LLM requests, shared fairly between suites.
+
+Several suites (or several `test_pilot_simple.py` processes) on the same
+provider hit its rate limit together and back off in lockstep. `RateLimiter`
+meters requests per minute and tokens per minute with two token buckets that
+refill continuously; a request waits until both have room. Within a process,
+waiting requests are granted round-robin per suite (`current_suite`), so one
+busy suite cannot starve the others. With a SQLite file the buckets are shared
+by every process using the same file and bucket name; fairness across
+processes comes from each process polling the shared buckets.
+
+Tokens are charged up front from an estimate of the prompt size and corrected
+once the response reports its actual usage. `RateLimitedChatModel` wraps the
+chat model; the time every suite spent waiting is kept in `stats` and written
+to the event log.
+"""
+
+import asyncio
+import os
+import sqlite3
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from test_pilot.events import current_suite, sink
+from test_pilot.llm_wrapper import INNER_CALL
+from test_pilot.tool_middleware import result_text
+
+# Upper bound for one wait, so a bucket shared with other processes is polled
+MAX_POLL = 1.0
+
+
+def _refill(levels, elapsed, limits):
+    return {key: min(limit, levels[key] + elapsed * limit / 60) for key, limit in limits.items()}
+
+
+def _take(levels, limits, cost):
+    """Deduct `cost` from the refilled `levels`; returns `(levels, wait)` with wait 0 on success"""
+    wait = 0.0
+    for key, limit in limits.items():
+        # A request larger than the bucket would never fit; it waits for a full bucket instead
+        needed = min(cost[key], limit) - levels[key]
+        if needed > 0:
+            wait = max(wait, needed * 60 / limit)
+    if wait > 0:
+        return levels, wait
+    return {key: levels[key] - cost[key] for key in limits}, 0.0
+
+
+class MemoryBucket:
+    """Buckets of one process"""
+
+    def __init__(self, limits):
+        self.limits = limits
+        self.levels = dict(limits)
+        self.updated = time.monotonic()
+
+    def take(self, cost):
+        now = time.monotonic()
+        levels = _refill(self.levels, now - self.updated, self.limits)
+        self.levels, wait = _take(levels, self.limits, cost)
+        self.updated = now
+        return wait
+
+    def adjust(self, key, amount):
+        self.levels[key] -= amount
+
+
+class SqliteBucket:
+    """Buckets shared between processes through a SQLite file.
+
+    Every call may wait up to 30s for another process's lock, so the limiter
+    runs them in a thread when called from the event loop.
+    """
+
+    def __init__(self, limits, path, name):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.limits = limits
+        self.path = path
+        self.name = name
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_buckets ("
+                "name TEXT NOT NULL, key TEXT NOT NULL, level REAL NOT NULL, updated REAL NOT NULL, "
+                "PRIMARY KEY (name, key))"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            # A failed BEGIN leaves no transaction to roll back
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    def _levels(self, conn, now):
+        rows = dict(
+            (key, (level, updated))
+            for key, level, updated in conn.execute("SELECT key, level, updated FROM rate_buckets WHERE name = ?", (self.name,))
+        )
+        levels = {}
+        for key, limit in self.limits.items():
+            level, updated = rows.get(key, (limit, now))
+            levels[key] = min(limit, level + max(0.0, now - updated) * limit / 60)
+        return levels
+
+    def _store(self, conn, levels, now):
+        conn.executemany(
+            "INSERT OR REPLACE INTO rate_buckets (name, key, level, updated) VALUES (?, ?, ?, ?)",
+            [(self.name, key, level, now) for key, level in levels.items()],
+        )
+
+    def take(self, cost):
+        # Wall clock time, since the buckets are shared with other processes
+        now = time.time()
+        with self._connect() as conn:
+            levels, wait = _take(self._levels(conn, now), self.limits, cost)
+            self._store(conn, levels, now)
+        return wait
+
+    def adjust(self, key, amount):
+        now = time.time()
+        with self._connect() as conn:
+            levels = self._levels(conn, now)
+            levels[key] -= amount
+            self._store(conn, levels, now)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits with round-robin queuing per suite"""
+
+    def __init__(self, rpm=None, tpm=None, db_path=None, name="llm"):
+        limits = {key: float(limit) for key, limit in (("requests", rpm), ("tokens", tpm)) if limit}
+        self.bucket = SqliteBucket(limits, db_path, name) if db_path else MemoryBucket(limits)
+        self.limits = limits
+        self.stats = {}
+        self._queues = {}
+        self._order = deque()
+        self._dispatcher = None
+
+    def _cost(self, tokens):
+        return {"requests": 1, "tokens": tokens}
+
+    async def _bucket_call(self, method, *args):
+        """Call a bucket method without blocking the event loop on a shared bucket's lock"""
+        if isinstance(self.bucket, SqliteBucket):
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def acquire(self, tokens, key="default"):
+        """Wait for the turn of `key` and room in the buckets; returns the seconds waited"""
+        started = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        if key not in self._queues:
+            self._queues[key] = deque()
+            self._order.append(key)
+        self._queues[key].append((self._cost(tokens), waiter))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await waiter
+        waited = time.monotonic() - started
+        stats = self.stats.setdefault(key, {"requests": 0, "tokens": 0, "waited_s": 0.0, "max_wait_s": 0.0})
+        stats["requests"] += 1
+        stats["waited_s"] += waited
+        stats["max_wait_s"] = max(stats["max_wait_s"], waited)
+        return waited
+
+    async def _dispatch(self):
+        while self._order:
+            key = self._order[0]
+            queue = self._queues[key]
+            cost, waiter = queue[0]
+            if not waiter.cancelled():
+                try:
+                    wait = await self._bucket_call(self.bucket.take, cost)
+                except Exception as e:
+                    # e.g. the shared database stayed locked; fail this request, keep serving the others
+                    if not waiter.done():
+                        waiter.set_exception(e)
+                    wait = 0
+                if wait > 0:
+                    await asyncio.sleep(min(wait, MAX_POLL))
+                    continue
+                # The waiter may have been cancelled while the bucket was locked
+                if not waiter.done():
+                    waiter.set_result(None)
+            queue.popleft()
+            self._order.popleft()
+            if queue:
+                self._order.append(key)
+            else:
+                del self._queues[key]
+
+    def acquire_sync(self, tokens):
+        """Blocking acquire for synchronous calls (not queued)"""
+        while (wait := self.bucket.take(self._cost(tokens))) > 0:
+            time.sleep(min(wait, MAX_POLL))
+
+    def _correction(self, estimated, actual, key):
+        if key in self.stats:
+            self.stats[key]["tokens"] += actual
+        return actual - estimated if "tokens" in self.limits else 0
+
+    def settle(self, estimated, actual, key="default"):
+        """Correct the token bucket once the actual usage of a request is known"""
+        correction = self._correction(estimated, actual, key)
+        if correction:
+            self.bucket.adjust("tokens", correction)
+
+    async def asettle(self, estimated, actual, key="default"):
+        """`settle` for calls made on the event loop"""
+        correction = self._correction(estimated, actual, key)
+        if correction:
+            await self._bucket_call(self.bucket.adjust, "tokens", correction)
+
+    def summary_table(self):
+        lines = [
+            "| Suite | Requests | Tokens | Waited (s) | Max wait (s) |",
+            "|-------|----------|--------|------------|--------------|",
+        ]
+        for key, stats in sorted(self.stats.items()):
+            lines.append(
+                f"| {key} | {stats['requests']} | {stats['tokens']} | {stats['waited_s']:.1f} | {stats['max_wait_s']:.1f} |"
+            )
+        return "\n".join(lines)
+
+
+def estimate_tokens(messages):
+    """Rough prompt size in tokens (4 characters per token)"""
+    chars = 0
+    for message in messages:
+        chars += len(result_text((message.content,)) if isinstance(message.content, list) else str(message.content))
+        chars += sum(len(str(call["args"])) for call in getattr(message, "tool_calls", None) or [])
+    return chars // 4
+
+
+def _used_tokens(message, estimated):
+    """Tokens a response reports, or the estimate when it reports no usage"""
+    usage = getattr(message, "usage_metadata", None)
+    return usage["total_tokens"] if usage else estimated
+
+
+class RateLimitedChatModel(BaseChatModel):
+    inner: Any
+    limiter: Any
+
+    @property
+    def _llm_type(self):
+        return "rate-limited"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={"inner": self.inner.bind_tools(tools, **kwargs)})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        estimated = estimate_tokens(messages)
+        self.limiter.acquire_sync(estimated)
+        message = self.inner.invoke(messages, INNER_CALL, stop=stop, **kwargs)
+        self.limiter.settle(estimated, _used_tokens(message, estimated), None)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        key = current_suite.get() or "default"
+        estimated = estimate_tokens(messages)
+        waited = await self.limiter.acquire(estimated, key)
+        if waited >= 0.01:
+            sink().emit("rate_limit_wait", waited_ms=int(waited * 1000), est_tokens=estimated)
+        message = await self.inner.ainvoke(messages, INNER_CALL, stop=stop, **kwargs)
+        await self.limiter.asettle(estimated, _used_tokens(message, estimated), key)
+        return ChatResult(generations=[ChatGeneration(message=message)])
@@ -0,0 +1,83 @@
+"""
+regression
+
+Post-run regression detection against the run history.
+
+Every phase of the run is compared with a rolling baseline: the last
+`window` passed runs of the same phase of the same suite content (suite hash)
+in `test_pilot.run_history`. For each metric (duration, step count, token
+usage) the baseline median and median absolute deviation (MAD) give a robust
+z-score
+
+    z = 0.6745 * (value - median) / MAD
+
+and a phase regressed on a metric when z exceeds `threshold` and the value is
+also at least `min_change` (relative) above the median, so that tiny
+absolute changes of a very stable metric are not flagged. The MAD is floored
+at 5% of the median (and one unit), since a baseline of identical values
+would otherwise flag any change. Only increases are reported.
+"""
+
+import statistics
+
+METRICS = ("duration_ms", "steps", "total_tokens")
+# Scales the MAD to the standard deviation of a normal distribution
+MAD_SCALE = 0.6745
+
+
+def robust_score(value, baseline):
+    """`(z, median, mad)` of `value` against the baseline values"""
+    median = statistics.median(baseline)
+    mad = statistics.median(abs(sample - median) for sample in baseline)
+    mad = max(mad, 0.05 * median, 1)
+    return MAD_SCALE * (value - median) / mad, median, mad
+
+
+def phase_regressions(phase, baseline_rows, threshold=3.5, min_change=0.2, min_runs=5):
+    """Regressed metrics of one phase (a handoff phase dict) against baseline row dicts"""
+    if len(baseline_rows) < min_runs:
+        return []
+    regressions = []
+    for metric in METRICS:
+        value = phase["tokens"]["total"] if metric == "total_tokens" else phase[metric]
+        baseline = [row[metric] for row in baseline_rows if row[metric] is not None]
+        if value is None or len(baseline) < min_runs or not any(baseline):
+            continue
+        score, median, mad = robust_score(value, baseline)
+        if score > threshold and value >= median * (1 + min_change):
+            regressions.append({
+                "metric": metric,
+                "value": value,
+                "baseline_median": median,
+                "baseline_mad": round(mad, 1),
+                "score": round(score, 1),
+                "baseline_runs": len(baseline),
+            })
+    return regressions
+
+
+def find_regressions(history, formatter, window=20, threshold=3.5, min_change=0.2, min_runs=5):
+    """Regressions of every phase of the run collected by `formatter`, against `history`"""
+    results = []
+    for test in formatter.document()["individual_test_results"]:
+        if not test["suite_hash"]:
+            continue
+        for phase in test["phases"]:
+            if phase["status"] == "running":
+                continue
+            baseline = history.recent_phases(test["suite_hash"], phase["name"], window)
+            for regression in phase_regressions(phase, baseline, threshold, min_change, min_runs):
+                results.append({"suite": test["name"], "phase": phase["name"], **regression})
+    return results
+
+
+def regressions_report(regressions):
+    lines = [
+        "| Suite | Phase | Metric | Value | Baseline median | MAD | Score |",
+        "|-------|-------|--------|-------|-----------------|-----|-------|",
+    ]
+    lines.extend(
+        f"| {row['suite']} | {row['phase']} | {row['metric']} | {row['value']} | {row['baseline_median']} | {row['baseline_mad']} | {row['score']} |"
+        for row in regressions
+    )
+    return "\n".join(lines)
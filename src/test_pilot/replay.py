@@ -0,0 +1,130 @@
+"""
+replay
+
+Record agentic runs and replay them without the LLM.
+
+Once the ReAct agent has passed a suite (its report ends with the verdict
+`RESULT: PASSED`), the sequence of MCP tool calls it made is known.
+`TraceRecorder` captures the successful calls, and the trace of the passed run
+is stored with its outcome, keyed by the content hash of the prompt. Only
+traces of passed runs are replayed. Later runs replay the trace
+directly through `session.call_tool`; if a step diverges (an error, or a ref
+that no longer matches the page) the agent takes over from that step with the
+replayed prefix described in its prompt.
+"""
+
+import json
+import os
+import re
+
+from test_pilot.events import LOG_LEVELS, sink, utc_timestamp
+from test_pilot.tool_middleware import result_text
+
+TRACE_DIR = os.path.join(".test_pilot", "traces")
+DIVERGENCE = re.compile(r"not found in the current page snapshot|^### Error|^Error:", re.MULTILINE)
+
+
+class TraceRecorder:
+    """Tool middleware recording every successful tool call in order"""
+
+    def __init__(self, prefix=None):
+        self.steps = list(prefix or [])
+
+    async def __call__(self, tool_name, arguments, call_next):
+        result = await call_next(arguments)
+        # Failed calls raise or return an error; the agent retried them, a replay must not
+        if not DIVERGENCE.search(result_text(result)):
+            self.steps.append({"tool": tool_name, "arguments": dict(arguments)})
+        return result
+
+
+def trace_path(key, trace_dir=TRACE_DIR):
+    return os.path.join(trace_dir, f"{key}.json")
+
+
+def load_trace(key, trace_dir=TRACE_DIR):
+    """The recorded trace of a passed run for `key`, or None"""
+    path = trace_path(key, trace_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            trace = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"⚠️  Ignoring unreadable trace {path}: {e}")
+        return None
+    if trace.get("outcome") != "passed":
+        # Replaying it would report the steps of a run that did not pass as passed
+        print(f"⚠️  Ignoring trace {path}, not recorded from a passed run")
+        return None
+    return trace
+
+
+def save_trace(key, steps, label, trace_dir=TRACE_DIR, outcome="passed"):
+    os.makedirs(trace_dir, exist_ok=True)
+    path = trace_path(key, trace_dir)
+    trace = {"key": key, "label": label, "recorded_at_utc": utc_timestamp(), "outcome": outcome, "steps": steps}
+    with open(path + ".tmp", "w") as f:
+        json.dump(trace, f, indent=2)
+    os.replace(path + ".tmp", path)
+    print(f"✅ Recorded {len(steps)} tool calls to {path}")
+    return path
+
+
+def _text(result):
+    return "\n".join(content.text for content in result.content if getattr(content, "text", None))
+
+
+async def replay_trace(session, steps, label):
+    """Execute recorded steps on the MCP session until one diverges.
+
+    Returns `(completed, error)`: the number of steps replayed successfully and
+    the error text of the diverging step, or None when the whole trace replayed.
+    """
+    events = sink()
+    for index, step in enumerate(steps):
+        try:
+            result = await session.call_tool(step["tool"], step["arguments"])
+            text = _text(result)
+            error = text if result.isError or DIVERGENCE.search(text) else None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        if events.level >= LOG_LEVELS["info"]:
+            events.emit("replay_step", label=label, step=index + 1, tool=step["tool"], ok=error is None)
+        if error is not None:
+            return index, error[:1000]
+    return len(steps), None
+
+
+def _describe(step):
+    return f"{step['tool']}({json.dumps(step['arguments'], ensure_ascii=False)})"
+
+
+def resume_message(message, replayed, diverged, error):
+    """Prompt for the agent taking over after a replay diverged"""
+    done = "\n".join(f"{index}. {_describe(step)}" for index, step in enumerate(replayed, 1)) or "(none)"
+    return (
+        message +
+        "\n\nREPLAY STATUS: A recorded run of this test suite was replayed deterministically. "
+        "The following tool calls have already been executed successfully in this browser session:\n" +
+        done +
+        f"\n\nThe next recorded call {_describe(diverged)} failed with:\n{error}\n\n"
+        "Take an accessibility snapshot to see the current page, then continue the test suite from this point. "
+        "Do not repeat the steps that were already executed.\n"
+    )
+
+
+def replay_report(steps):
+    """Markdown report for a run that replayed completely without the LLM"""
+    lines = [
+        "# Test Suite Report (deterministic replay)",
+        "",
+        f"All {len(steps)} recorded tool calls replayed successfully without LLM involvement.",
+        "",
+        "| # | Tool call | Result |",
+        "|---|-----------|--------|",
+    ]
+    lines.extend(f"| {index} | `{_describe(step).replace('|', '/')}` | passed |" for index, step in enumerate(steps, 1))
+    # The recorded run passed and every step replayed as recorded
+    lines.extend(["", "RESULT: PASSED"])
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,149 @@
+"""
+routing
+
+Tiered model routing: routine steps on a small fast model, the rest on the
+strong one.
+
+Most ReAct steps are mechanical (type the username, click "Next", take a
+snapshot) and do not need the model passed with `--provider/--model`.
+`RoutedChatModel` sends each step to the fast model unless `escalation()`
+finds a reason to use the strong model:
+
+- tool_error:      the last tool call failed
+- unexpected_page: the page title shows an error, expired session or captcha
+- repeated_call:   the fast model repeated its previous tool call
+- final_report:    the fast model answered without a tool call, i.e. it wants
+                   to write the report, so the strong model writes it instead
+- invalid_call:    the fast model called a tool that does not exist
+- fast_error:      the fast model request failed (timeout, rate limit, provider
+                   error)
+
+The last three are detected from the fast model's answer, which is then
+discarded. Decisions are written to the event log and counted in `stats`.
+"""
+
+import json
+import re
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field
+
+from test_pilot.compaction import PAGE_LINE
+from test_pilot.events import LOG_LEVELS, sink
+from test_pilot.llm_wrapper import INNER_CALL
+from test_pilot.tool_middleware import result_text
+
+TOOL_ERROR = re.compile(r"^\s*(?:### Result\s*)?Error\b", re.IGNORECASE)
+UNEXPECTED_PAGE = re.compile(
+    r"\b(?:404|500|not found|access denied|forbidden|something went wrong|internal server error|"
+    r"session (?:has )?expired|captcha|unauthori[sz]ed)\b",
+    re.IGNORECASE,
+)
+
+
+def _tool_name(tool):
+    if isinstance(tool, dict):
+        return tool.get("name") or tool.get("function", {}).get("name")
+    return getattr(tool, "name", None)
+
+
+def _last_exchange(messages):
+    """The last AI message and the tool results that answer it"""
+    results = []
+    for message in reversed(messages):
+        if isinstance(message, ToolMessage):
+            results.append(message)
+        elif isinstance(message, AIMessage):
+            return message, results[::-1]
+        else:
+            break
+    return None, results[::-1]
+
+
+def _signature(calls):
+    return [(call["name"], json.dumps(call["args"], sort_keys=True, default=str)) for call in calls]
+
+
+def escalation(messages):
+    """Reason to send this step to the strong model, judged from the history, or None"""
+    call, results = _last_exchange(messages)
+    for result in results:
+        text = result_text((result.content,))
+        if getattr(result, "status", "success") == "error" or TOOL_ERROR.match(text):
+            return "tool_error"
+        titles = "\n".join(line for line in PAGE_LINE.findall(text) if "Page Title" in line)
+        if titles and UNEXPECTED_PAGE.search(titles):
+            return "unexpected_page"
+    if call is not None and call.tool_calls:
+        previous, _ = _last_exchange(messages[:messages.index(call)])
+        if previous is not None and _signature(previous.tool_calls) == _signature(call.tool_calls):
+            return "repeated_call"
+    return None
+
+
+class RoutedChatModel(BaseChatModel):
+    fast: Any
+    strong: Any
+    tool_names: Any = None
+    stats: dict = Field(default_factory=dict)
+
+    @property
+    def _llm_type(self):
+        return "routed"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={
+            "fast": self.fast.bind_tools(tools, **kwargs),
+            "strong": self.strong.bind_tools(tools, **kwargs),
+            "tool_names": {_tool_name(tool) for tool in tools},
+        })
+
+    def _rejection(self, message):
+        """Reason to discard the fast model's answer, or None"""
+        if not message.tool_calls:
+            return "final_report"
+        if self.tool_names is not None and any(call["name"] not in self.tool_names for call in message.tool_calls):
+            return "invalid_call"
+        return None
+
+    def _route(self, tier, reason, error=None):
+        key = f"{tier}:{reason}" if reason else tier
+        self.stats[key] = self.stats.get(key, 0) + 1
+        if reason:
+            print(f"🔀 Escalating step to the strong model ({reason}{f': {error}' if error else ''})")
+        if sink().level >= LOG_LEVELS["info"]:
+            sink().emit("llm_route", tier=tier, reason=reason, error=error)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        reason = escalation(messages)
+        error = None
+        if reason is None:
+            try:
+                message = self.fast.invoke(messages, INNER_CALL, stop=stop, **kwargs)
+                reason = self._rejection(message)
+            except Exception as e:
+                reason, error = "fast_error", type(e).__name__
+            if reason is None:
+                self._route("fast", None)
+                return ChatResult(generations=[ChatGeneration(message=message)])
+        self._route("strong", reason, error)
+        return ChatResult(generations=[ChatGeneration(message=self.strong.invoke(messages, INNER_CALL, stop=stop, **kwargs))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        reason = escalation(messages)
+        error = None
+        if reason is None:
+            try:
+                message = await self.fast.ainvoke(messages, INNER_CALL, stop=stop, **kwargs)
+                reason = self._rejection(message)
+            except Exception as e:
+                reason, error = "fast_error", type(e).__name__
+            if reason is None:
+                self._route("fast", None)
+                return ChatResult(generations=[ChatGeneration(message=message)])
+        self._route("strong", reason, error)
+        message = await self.strong.ainvoke(messages, INNER_CALL, stop=stop, **kwargs)
+        return ChatResult(generations=[ChatGeneration(message=message)])
@@ -0,0 +1,310 @@
+"""
+run_history
+
+Local SQLite history of test runs, and a CLI to query it.
+
+`test_report.md` and `test_report.json` only describe the latest run. The
+orchestrator appends every run to a database (`RUN_HISTORY_DB`) with one row
+per run, phase (agent run), step and tool call, including timings and token
+usage; phases are keyed by suite content hash, so edits to a suite start a new
+series. Indexes on suite hash, phase and start time keep the queries fast with
+tens of thousands of runs:
+
+    python -m test_pilot.run_history phases --suite icims-ats-demo --by week
+    python -m test_pilot.run_history flaky --since 30
+    python -m test_pilot.run_history slowest --limit 20
+    python -m test_pilot.run_history runs
+"""
+
+import argparse
+import os
+import sqlite3
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from test_pilot.profiler import percentile
+
+RUN_HISTORY_DB = ".test_pilot/runs.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started_at TEXT NOT NULL,
+    ended_at TEXT,
+    status TEXT NOT NULL,
+    total_tests INTEGER,
+    passed INTEGER,
+    failed INTEGER,
+    provider TEXT,
+    model TEXT,
+    command TEXT
+);
+CREATE TABLE IF NOT EXISTS phases (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    suite TEXT NOT NULL,
+    suite_hash TEXT,
+    phase TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    ended_at TEXT,
+    duration_ms INTEGER,
+    steps INTEGER,
+    llm_calls INTEGER,
+    tool_calls INTEGER,
+    tool_errors INTEGER,
+    input_tokens INTEGER,
+    output_tokens INTEGER,
+    total_tokens INTEGER,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS steps (
+    id INTEGER PRIMARY KEY,
+    phase_id INTEGER NOT NULL REFERENCES phases(id),
+    step INTEGER NOT NULL,
+    node TEXT NOT NULL,
+    time TEXT NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    input_tokens INTEGER,
+    output_tokens INTEGER
+);
+CREATE TABLE IF NOT EXISTS tool_calls (
+    id INTEGER PRIMARY KEY,
+    step_id INTEGER NOT NULL REFERENCES steps(id),
+    tool TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_started ON runs (started_at);
+CREATE INDEX IF NOT EXISTS phases_run ON phases (run_id);
+CREATE INDEX IF NOT EXISTS phases_suite ON phases (suite_hash, phase, started_at);
+CREATE INDEX IF NOT EXISTS phases_name ON phases (suite, phase, started_at);
+CREATE INDEX IF NOT EXISTS phases_started ON phases (started_at);
+CREATE INDEX IF NOT EXISTS steps_phase ON steps (phase_id);
+CREATE INDEX IF NOT EXISTS steps_duration ON steps (duration_ms);
+CREATE INDEX IF NOT EXISTS tool_calls_step ON tool_calls (step_id);
+"""
+
+PERIODS = {
+    "run": "(SELECT started_at FROM runs WHERE runs.id = phases.run_id)",
+    "day": "substr(phases.started_at, 1, 10)",
+    "week": "strftime('%Y-W%W', phases.started_at)",
+    "month": "substr(phases.started_at, 1, 7)",
+}
+
+
+def _filters(suite=None, since_days=None):
+    """WHERE clauses and parameters selecting phases of a suite (name or hash prefix) in the last days"""
+    where, params = [], []
+    if since_days:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=since_days)
+        where.append("phases.started_at >= ?")
+        params.append(cutoff.isoformat(timespec="milliseconds").replace("+00:00", "Z"))
+    if suite:
+        where.append("(phases.suite = ? OR phases.suite_hash LIKE ?)")
+        params += [suite, f"{suite}%"]
+    return where or ["1"], params
+
+
+class RunHistory:
+    def __init__(self, path=RUN_HISTORY_DB):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record(self, formatter, provider=None, model=None, command=None):
+        """Store the run collected by a `HandoffFormatter`; returns the run id"""
+        document = formatter.document()
+        summary = document["test_run_summary"]
+        metadata = document["execution_metadata"]
+        with self._connect() as conn:
+            run_id = conn.execute(
+                "INSERT INTO runs (started_at, ended_at, status, total_tests, passed, failed, provider, model, command) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    metadata["overall_start_time_utc"], metadata["overall_end_time_utc"], summary["status"],
+                    summary["total_tests"], summary["passed"], summary["failed"], provider, model, command,
+                ),
+            ).lastrowid
+            for test in document["individual_test_results"]:
+                for record in formatter.tests[test["name"]]:
+                    self._record_phase(conn, run_id, test, record)
+        return run_id
+
+    def _record_phase(self, conn, run_id, test, record):
+        phase = record.data
+        phase_id = conn.execute(
+            "INSERT INTO phases (run_id, suite, suite_hash, phase, status, started_at, ended_at, duration_ms, steps, "
+            "llm_calls, tool_calls, tool_errors, input_tokens, output_tokens, total_tokens, error) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                run_id, test["name"], test["suite_hash"], phase["name"], phase["status"], phase["start_time_utc"],
+                phase["end_time_utc"], phase["duration_ms"], phase["steps"], phase["llm_calls"], phase["tool_calls"],
+                phase["tool_errors"], phase["tokens"]["input"], phase["tokens"]["output"], phase["tokens"]["total"],
+                phase["error"],
+            ),
+        ).lastrowid
+        for step in record.steps:
+            step_id = conn.execute(
+                "INSERT INTO steps (phase_id, step, node, time, duration_ms, input_tokens, output_tokens) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (phase_id, step["step"], step["node"], step["time_utc"], step["duration_ms"], step["input_tokens"], step["output_tokens"]),
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO tool_calls (step_id, tool, status) VALUES (?, ?, ?)",
+                [(step_id, tool, status) for tool, status in step["tools"]],
+            )
+
+    def _phases(self, columns, suite=None, since_days=None, order="phases.started_at"):
+        """Phase rows, optionally for one suite (name or hash prefix) and the last `since_days` days"""
+        where, params = _filters(suite, since_days)
+        with self._connect() as conn:
+            return conn.execute(
+                f"SELECT {columns} FROM phases WHERE {' AND '.join(where)} ORDER BY {order}", params,
+            ).fetchall()
+
+    def phase_durations(self, suite=None, since_days=None, by="day"):
+        """p50/p95 duration, mean step count and pass rate per suite, phase and period"""
+        rows = self._phases(
+            f"suite, phase, {PERIODS[by]}, duration_ms, steps, status", suite, since_days,
+            order="suite, phase, phases.started_at",
+        )
+        groups = defaultdict(list)
+        for suite_name, phase, period, duration_ms, steps, status in rows:
+            groups[(suite_name, phase, period)].append((duration_ms, steps, status))
+        return [
+            {
+                "suite": suite_name,
+                "phase": phase,
+                "period": period,
+                "runs": len(values),
+                "p50_ms": percentile([value[0] for value in values if value[0] is not None], 50),
+                "p95_ms": percentile([value[0] for value in values if value[0] is not None], 95),
+                "mean_steps": round(sum(value[1] or 0 for value in values) / len(values), 1),
+                "pass_rate": round(sum(1 for value in values if value[2] == "passed") / len(values), 3),
+            }
+            for (suite_name, phase, period), values in groups.items()
+        ]
+
+    def flaky(self, suite=None, since_days=None, min_runs=3):
+        """Phases of an unchanged suite (same hash) that both passed and failed, by flake rate.
+
+        The flake rate is the share of consecutive runs whose status differs
+        from the run before, so a phase that broke once and stayed broken
+        scores low and one that alternates scores high.
+        """
+        rows = self._phases(
+            "suite, suite_hash, phase, status", suite, since_days,
+            order="suite_hash, phase, phases.started_at",
+        )
+        series = defaultdict(list)
+        for suite_name, hash_, phase, status in rows:
+            series[(suite_name, hash_, phase)].append(status == "passed")
+        results = []
+        for (suite_name, hash_, phase), passes in series.items():
+            if len(passes) < min_runs or all(passes) or not any(passes):
+                continue
+            flips = sum(1 for previous, current in zip(passes, passes[1:]) if previous != current)
+            results.append({
+                "suite": suite_name,
+                "suite_hash": hash_,
+                "phase": phase,
+                "runs": len(passes),
+                "failures": passes.count(False),
+                "flake_rate": round(flips / (len(passes) - 1), 3),
+            })
+        return sorted(results, key=lambda row: row["flake_rate"], reverse=True)
+
+    def slowest_steps(self, suite=None, since_days=None, limit=20):
+        """The slowest individual steps with their phase and tool calls"""
+        where, params = _filters(suite, since_days)
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT steps.time, phases.suite, phases.phase, steps.step, steps.node, steps.duration_ms, "
+                "(SELECT group_concat(tool, ', ') FROM tool_calls WHERE tool_calls.step_id = steps.id) "
+                f"FROM steps JOIN phases ON phases.id = steps.phase_id WHERE {' AND '.join(where)} "
+                "ORDER BY steps.duration_ms DESC LIMIT ?",
+                params + [limit],
+            ).fetchall()
+        columns = ("time", "suite", "phase", "step", "node", "duration_ms", "tools")
+        return [dict(zip(columns, row)) for row in rows]
+
+    def recent_phases(self, suite_hash, phase, limit=20):
+        """Metrics of the last `limit` passed runs of a phase of the same suite content, newest first"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT duration_ms, steps, total_tokens FROM phases "
+                "WHERE suite_hash = ? AND phase = ? AND status = 'passed' ORDER BY started_at DESC LIMIT ?",
+                (suite_hash, phase, limit),
+            ).fetchall()
+        return [dict(zip(("duration_ms", "steps", "total_tokens"), row)) for row in rows]
+
+    def runs(self, limit=20):
+        """The most recent runs"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, started_at, ended_at, status, total_tests, passed, failed, provider, model "
+                "FROM runs ORDER BY started_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        columns = ("id", "started_at", "ended_at", "status", "total_tests", "passed", "failed", "provider", "model")
+        return [dict(zip(columns, row)) for row in rows]
+
+
+def markdown_table(rows):
+    if not rows:
+        return "No matching runs."
+    columns = list(rows[0])
+    lines = ["| " + " | ".join(columns) + " |", "|" + "|".join("---" for _ in columns) + "|"]
+    lines.extend("| " + " | ".join("" if row[column] is None else str(row[column]) for column in columns) + " |" for row in rows)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m test_pilot.run_history", description="Query the test run history")
+    parser.add_argument("--db", default=RUN_HISTORY_DB, help=f"Run history database (default: {RUN_HISTORY_DB})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (
+        ("phases", "p50/p95 duration per phase over time"),
+        ("flaky", "phases that both passed and failed on the same suite content"),
+        ("slowest", "slowest individual steps"),
+    ):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--suite", help="Suite name or suite hash prefix")
+        command.add_argument("--since", type=float, default=None, help="Only runs of the last N days")
+        if name == "phases":
+            command.add_argument("--by", choices=list(PERIODS), default="day", help="Period to group by (default: day)")
+        if name == "flaky":
+            command.add_argument("--min-runs", type=int, default=3, help="Minimum runs of a phase (default: 3)")
+        if name == "slowest":
+            command.add_argument("--limit", type=int, default=20, help="Number of steps (default: 20)")
+    commands.add_parser("runs", help="most recent runs").add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    history = RunHistory(args.db)
+    if args.command == "phases":
+        rows = history.phase_durations(args.suite, args.since, args.by)
+    elif args.command == "flaky":
+        rows = history.flaky(args.suite, args.since, args.min_runs)
+    elif args.command == "slowest":
+        rows = history.slowest_steps(args.suite, args.since, args.limit)
+    else:
+        rows = history.runs(args.limit)
+    print(markdown_table(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+runner
+
+Concurrent multi-suite execution.
+
+A single process drives many browsers and LLM conversations at once: suites are
+discovered from a file, directory or glob, executed concurrently with a bounded
+number in flight, and their individual reports merged into one run report.
+"""
+
+import asyncio
+import glob
+import os
+import time
+
+from test_pilot.events import current_suite
+
+
+def discover_suites(spec):
+    """Resolve a suite file, directory or glob pattern into a sorted list of suite paths"""
+    if os.path.isdir(spec):
+        return sorted(
+            os.path.join(spec, name) for name in os.listdir(spec)
+            if name.endswith(".md") and os.path.isfile(os.path.join(spec, name))
+        )
+    if glob.has_magic(spec):
+        return sorted(path for path in glob.glob(spec, recursive=True) if os.path.isfile(path))
+    return [spec]
+
+
+def suite_name(path):
+    """Short display name for a suite file"""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+async def run_suites(suite_paths, run_suite, max_parallel=4):
+    """Run `run_suite(path, test_suite)` for every suite with at most `max_parallel` in flight.
+
+    Returns one result dict per suite, in input order. A failing suite never
+    cancels the others; its exception is recorded in the result instead.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_parallel))
+
+    async def run_one(path):
+        async with semaphore:
+            current_suite.set(suite_name(path))
+            started = time.monotonic()
+            result = {"suite": path, "name": suite_name(path), "status": "completed", "report": None, "error": None}
+            try:
+                with open(path, "r") as f:
+                    test_suite = f.read()
+                print(f"▶️  Starting suite: {path} (len={len(test_suite)} chars)")
+                result["report"] = await run_suite(path, test_suite)
+            except Exception as e:
+                result["status"] = "error"
+                result["error"] = f"{type(e).__name__}: {e}"
+                print(f"❌ Suite {path} failed: {result['error']}")
+            result["duration_ms"] = int((time.monotonic() - started) * 1000)
+            print(f"⏹️  Finished suite: {path} ({result['status']}, {result['duration_ms']} ms)")
+            return result
+
+    return await asyncio.gather(*(run_one(path) for path in suite_paths))
+
+
+def merge_reports(results):
+    """Merge per-suite markdown reports into a single run report"""
+    lines = [
+        "# Test Pilot Run Report",
+        "",
+        "| Suite | Status | Duration (ms) |",
+        "|-------|--------|---------------|",
+    ]
+    for result in results:
+        lines.append(f"| {result['name']} | {result['status']} | {result['duration_ms']} |")
+    for result in results:
+        lines.extend(["", "---", "", f"## Suite: {result['name']}", "", f"Source: `{result['suite']}`", ""])
+        if result["error"]:
+            lines.append(f"**Error:** {result['error']}")
+        else:
+            lines.append(result["report"] or "No report produced.")
+    return "\n".join(lines) + "\n"
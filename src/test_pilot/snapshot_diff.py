@@ -0,0 +1,108 @@
+"""
+snapshot_diff
+
+Structural diffs between consecutive accessibility snapshots.
+
+After small interactions most of the page is unchanged, yet every tool result
+carries the full tree again. `SnapshotDiffer` is a tool middleware that keeps
+the last snapshot per browser tab and, while the page URL stays the same,
+replaces the tree with the added, removed and changed nodes (keyed by their
+`[ref=...]`). A full snapshot is still returned for a new page, a new tab, or
+whenever the diff would not be meaningfully smaller than the tree itself.
+"""
+
+import re
+
+from test_pilot.compaction import SNAPSHOT_BLOCK, has_snapshot
+from test_pilot.tool_middleware import result_text, with_text
+
+REF = re.compile(r"\[ref=([^\]]+)\]")
+PAGE_URL = re.compile(r"^- Page URL: (.*)$", re.MULTILINE)
+
+
+def snapshot_nodes(yaml_text):
+    """Map each snapshot line to a stable key: its ref, or its nearest ancestor ref plus its text"""
+    nodes = {}
+    ancestors = []
+    for line in yaml_text.splitlines():
+        if not line.strip():
+            continue
+        indent = len(line) - len(line.lstrip())
+        while ancestors and ancestors[-1][0] >= indent:
+            ancestors.pop()
+        ref = REF.search(line)
+        if ref:
+            key = ref.group(1)
+            ancestors.append((indent, key))
+        else:
+            parent = ancestors[-1][1] if ancestors else ""
+            key = (parent, line.strip())
+        nodes.setdefault(key, line.strip())
+    return nodes
+
+
+def diff_snapshots(previous, current):
+    """Lines describing added (+), removed (-) and changed (~) nodes between two snapshots"""
+    before = snapshot_nodes(previous)
+    after = snapshot_nodes(current)
+    lines = []
+    for key, line in after.items():
+        if key not in before:
+            lines.append(f"+ {line}")
+        elif before[key] != line:
+            lines.append(f"~ {line}    (was: {before[key]})")
+    for key, line in before.items():
+        if key not in after:
+            lines.append(f"- {line}")
+    return lines
+
+
+class SnapshotDiffer:
+    """Tool middleware returning snapshot diffs against the previous snapshot of the same tab"""
+
+    def __init__(self, max_ratio=0.5):
+        self.max_ratio = max_ratio
+        self._tab = 0
+        self._tab_count = 1
+        self._last = {}
+
+    def _track_tabs(self, tool_name, arguments):
+        if tool_name == "browser_tab_select":
+            self._tab = arguments.get("index", self._tab)
+        elif tool_name == "browser_tab_new":
+            self._tab = self._tab_count
+            self._tab_count += 1
+        elif tool_name == "browser_tab_close":
+            self._last.clear()
+        elif tool_name == "browser_close":
+            self._tab, self._tab_count = 0, 1
+            self._last.clear()
+
+    def transform(self, text):
+        match = SNAPSHOT_BLOCK.search(text)
+        if not match or not has_snapshot(text):
+            return text
+        url = PAGE_URL.search(text)
+        url = url.group(1).strip() if url else None
+        current = match.group(1)
+        previous = self._last.get(self._tab)
+        self._last[self._tab] = (url, current)
+        if previous is None or previous[0] != url:
+            return text
+
+        changes = diff_snapshots(previous[1], current)
+        if len(changes) > self.max_ratio * max(1, len(current.splitlines())):
+            return text
+        body = "\n".join(changes) if changes else "(no changes)"
+        diff = (
+            "(changes since the previous snapshot of this page; unchanged nodes omitted, "
+            "refs from the previous snapshot remain valid)\n```diff\n" + body + "\n```"
+        )
+        return text[:match.start()] + diff + text[match.end():]
+
+    async def __call__(self, tool_name, arguments, call_next):
+        self._track_tabs(tool_name, arguments)
+        result = await call_next(arguments)
+        text = result_text(result)
+        transformed = self.transform(text)
+        return result if transformed is text else with_text(result, transformed)
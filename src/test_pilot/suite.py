@@ -0,0 +1,219 @@
+"""
+suite
+
+Phase-aware parsing and scheduling of markdown test suites.
+
+Suites are organized into `### Phase N: Title` sections. Each phase may declare
+the phases it needs with a line such as `Depends on: Phase 1` (or
+`Depends on: none`); phases without a declaration depend on the previous phase,
+which keeps the serial behaviour of an undeclared suite. A `Tools:` line in the
+preamble or in a phase limits the MCP tools bound to the agent, e.g.
+`Tools: browser_navigate, browser_click, browser_tab_*`. Independent phases can
+then run concurrently in separate browser sessions, each with a small LLM
+context holding only the shared suite text and its own phase.
+"""
+
+import asyncio
+import hashlib
+import re
+import time
+from dataclasses import dataclass, field
+
+PHASE_HEADING = re.compile(r"^###\s+Phase\s+(\d+)\s*:\s*(.+?)\s*$", re.MULTILINE)
+SECTION_HEADING = re.compile(r"^#{1,3}\s", re.MULTILINE)
+DEPENDS_ON = re.compile(r"^[\s>*-]*Depends on\s*:\s*(.+?)\s*$", re.IGNORECASE | re.MULTILINE)
+TOOLS_LINE = re.compile(r"^[\s>*-]*Tools\s*:\s*(.+?)\s*$", re.IGNORECASE | re.MULTILINE)
+LOGIN_TITLE = re.compile(r"login|authenticat|sign[\s-]?in", re.IGNORECASE)
+
+
+@dataclass
+class Phase:
+    number: int
+    title: str
+    body: str
+    depends_on: list = field(default_factory=list)
+
+    @property
+    def name(self):
+        return f"Phase {self.number}: {self.title}"
+
+    @property
+    def is_login(self):
+        return bool(LOGIN_TITLE.search(self.title))
+
+    @property
+    def tools(self):
+        return declared_tools(self.body)
+
+
+@dataclass
+class Suite:
+    preamble: str
+    phases: list
+    epilogue: str = ""
+
+    @property
+    def login_phase(self):
+        return next((phase for phase in self.phases if phase.is_login), None)
+
+    @property
+    def tools(self):
+        """Tool patterns for running the whole suite: the preamble's, or the union of all phases'"""
+        declared = declared_tools(self.preamble)
+        if declared is not None or not self.phases:
+            return declared
+        per_phase = [phase.tools for phase in self.phases]
+        if any(tools is None for tools in per_phase):
+            return None
+        return sorted({pattern for tools in per_phase for pattern in tools})
+
+    def phase_tools(self, phase):
+        return phase.tools if phase.tools is not None else declared_tools(self.preamble)
+
+    def phase(self, number):
+        return next(phase for phase in self.phases if phase.number == number)
+
+    def phase_text(self, phase):
+        """Suite text reduced to the shared sections plus a single phase"""
+        parts = [self.preamble.strip(), f"### {phase.name}\n\n{phase.body.strip()}"]
+        if self.epilogue.strip():
+            parts.append(self.epilogue.strip())
+        return "\n\n".join(parts)
+
+
+def declared_tools(text):
+    """Tool name patterns declared with a `Tools:` line, or None"""
+    match = TOOLS_LINE.search(text)
+    if not match:
+        return None
+    return [name.strip(" `") for name in re.split(r"[,\s]+", match.group(1)) if name.strip(" `")]
+
+
+def _parse_depends(declaration):
+    if declaration.strip().lower() in ("none", "nothing", "-"):
+        return []
+    return [int(number) for number in re.findall(r"\d+", declaration)]
+
+
+def parse_suite(test_suite, strict=True):
+    """Split a markdown suite into its preamble, phases and trailing shared sections.
+
+    With `strict`, unknown or cyclic `Depends on:` references raise ValueError,
+    since the phases are about to be scheduled by them.
+    """
+    headings = list(PHASE_HEADING.finditer(test_suite))
+    if not headings:
+        return Suite(preamble=test_suite, phases=[])
+
+    phases = []
+    epilogue = ""
+    for index, heading in enumerate(headings):
+        start = heading.end()
+        if index + 1 < len(headings):
+            end = headings[index + 1].start()
+        else:
+            next_section = SECTION_HEADING.search(test_suite, start)
+            end = next_section.start() if next_section else len(test_suite)
+            epilogue = test_suite[end:]
+        body = test_suite[start:end].strip()
+        body = re.sub(r"\n-{3,}\s*$", "", body).strip()
+
+        declared = DEPENDS_ON.search(body)
+        if declared:
+            depends_on = _parse_depends(declared.group(1))
+        else:
+            depends_on = [phases[-1].number] if phases else []
+        phases.append(Phase(number=int(heading.group(1)), title=heading.group(2), body=body, depends_on=depends_on))
+
+    if strict:
+        known = {phase.number for phase in phases}
+        for phase in phases:
+            unknown = [number for number in phase.depends_on if number not in known or number == phase.number]
+            if unknown:
+                raise ValueError(f"{phase.name} depends on unknown phase(s): {unknown}")
+        _check_acyclic(phases)
+    return Suite(preamble=test_suite[:headings[0].start()], phases=phases, epilogue=epilogue)
+
+
+def suite_tools(test_suite):
+    """Tool patterns declared by a suite run as one conversation; its phase dependencies are not used"""
+    return parse_suite(test_suite, strict=False).tools
+
+
+def _check_acyclic(phases):
+    graph = {phase.number: phase.depends_on for phase in phases}
+    visiting, done = set(), set()
+
+    def visit(number):
+        if number in done:
+            return
+        if number in visiting:
+            raise ValueError(f"Phase dependency cycle involving Phase {number}")
+        visiting.add(number)
+        for dependency in graph[number]:
+            visit(dependency)
+        visiting.discard(number)
+        done.add(number)
+
+    for number in graph:
+        visit(number)
+
+
+async def run_phases(suite, run_phase, max_parallel=4):
+    """Run every phase once its dependencies have passed, at most `max_parallel` at a time.
+
+    `run_phase(phase)` returns a dict with at least a `status` key; a phase
+    passes unless its status is "failed" or "error". Phases whose dependencies
+    did not pass are skipped. Results are returned in suite order.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_parallel))
+    finished = {phase.number: asyncio.Event() for phase in suite.phases}
+    results = {}
+
+    async def run_one(phase):
+        for dependency in phase.depends_on:
+            await finished[dependency].wait()
+        blocked = [number for number in phase.depends_on if results[number]["status"] in ("failed", "error", "skipped")]
+        started = time.monotonic()
+        if blocked:
+            result = {"status": "skipped", "error": f"dependency failed: {blocked}"}
+            print(f"⏭️  Skipping {phase.name} (dependency failed: {blocked})")
+        else:
+            async with semaphore:
+                print(f"▶️  Starting {phase.name}")
+                try:
+                    result = await run_phase(phase)
+                except Exception as e:
+                    result = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+                print(f"⏹️  Finished {phase.name} ({result['status']})")
+        result.setdefault("error", None)
+        result.update(phase=phase.number, name=phase.name, duration_ms=int((time.monotonic() - started) * 1000))
+        results[phase.number] = result
+        finished[phase.number].set()
+
+    await asyncio.gather(*(run_one(phase) for phase in suite.phases))
+    return [results[phase.number] for phase in suite.phases]
+
+
+def phases_report(results):
+    """Merge per-phase markdown reports into a single suite report"""
+    lines = [
+        "# Test Suite Report",
+        "",
+        "| Phase | Status | Duration (ms) |",
+        "|-------|--------|---------------|",
+    ]
+    for result in results:
+        lines.append(f"| {result['name']} | {result['status']} | {result['duration_ms']} |")
+    for result in results:
+        lines.extend(["", "---", "", f"## {result['name']}", ""])
+        if result["error"]:
+            lines.append(f"**Error:** {result['error']}")
+        if result.get("report"):
+            lines.append(result["report"])
+    return "\n".join(lines) + "\n"
+
+
+def suite_hash(text):
+    """Stable short content hash identifying a suite, phase or prompt"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
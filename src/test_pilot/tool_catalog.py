@@ -0,0 +1,78 @@
+"""
+tool_catalog
+
+Cached MCP tool discovery and per-phase tool subsetting.
+
+`load_mcp_tools` lists the Playwright tools on every start, and every LLM
+request then carries all of their names, descriptions and JSON schemas. The
+tool definitions are cached on disk keyed by the MCP server name and version
+(reported by `initialize`) together with the server arguments, so warm starts
+skip discovery. Suites and phases can declare the tools they need with a line
+such as `Tools: browser_navigate, browser_click, browser_tab_*`, and only
+those schemas are bound to the agent (see `test_pilot.suite`).
+"""
+
+import fnmatch
+import hashlib
+import json
+import os
+import re
+
+from mcp.types import Tool as MCPTool
+from langchain_mcp_adapters.tools import convert_mcp_tool_to_langchain_tool
+
+TOOL_CACHE_DIR = os.path.join(".test_pilot", "tools")
+
+
+def cache_key(init_result, server_params):
+    """Cache key from the server identity and the arguments it was started with"""
+    info = init_result.serverInfo
+    # The storage state file does not change the tool list, so keep it out of the key
+    args = list(server_params.args)
+    if "--storage-state" in args:
+        index = args.index("--storage-state")
+        del args[index:index + 2]
+    args = hashlib.sha256(json.dumps([server_params.command] + args).encode()).hexdigest()[:12]
+    name = re.sub(r"[^A-Za-z0-9_.-]", "_", f"{info.name}-{info.version}")
+    return f"{name}-{args}"
+
+
+async def _list_all_tools(session):
+    tools, cursor = [], None
+    while True:
+        page = await session.list_tools(cursor=cursor) if cursor else await session.list_tools()
+        tools.extend(page.tools)
+        cursor = page.nextCursor
+        if not cursor:
+            return tools
+
+
+async def load_tools(session, init_result, server_params, cache_dir=TOOL_CACHE_DIR):
+    """LangChain tools for the session, using cached MCP tool definitions when available"""
+    path = os.path.join(cache_dir, cache_key(init_result, server_params) + ".json")
+    mcp_tools = None
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                mcp_tools = [MCPTool.model_validate(tool) for tool in json.load(f)]
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Ignoring unreadable tool cache {path}: {e}")
+    if mcp_tools is None:
+        mcp_tools = await _list_all_tools(session)
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}-{id(mcp_tools)}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump([tool.model_dump(mode="json", exclude_none=True) for tool in mcp_tools], f)
+        os.replace(temp_path, path)
+    return [convert_mcp_tool_to_langchain_tool(session, tool) for tool in mcp_tools]
+
+
+def select_tools(tools, patterns):
+    """Subset of `tools` whose names match any of the glob `patterns` (all tools if None)"""
+    if not patterns:
+        return tools
+    selected = [tool for tool in tools if any(fnmatch.fnmatchcase(tool.name, pattern) for pattern in patterns)]
+    missing = [pattern for pattern in patterns if not any(fnmatch.fnmatchcase(tool.name, pattern) for tool in tools)]
+    if missing:
+        print(f"⚠️  Declared tools not offered by the MCP server: {missing}")
+    return selected
@@ -0,0 +1,66 @@
+"""
+tool_middleware
+
+Transformation layer between the MCP session and the ReAct agent.
+
+`load_mcp_tools` returns LangChain tools whose coroutine calls the MCP session
+and returns a `(content, artifact)` tuple. `apply_middleware` rewraps those
+tools so every call passes through a chain of middlewares, each an async
+callable `middleware(tool_name, arguments, call_next)` that may inspect or
+rewrite the arguments, time the call, or transform the result before it
+reaches the LLM conversation.
+"""
+
+from langchain_core.tools import StructuredTool
+
+
+def result_text(result):
+    """Text part of a tool result"""
+    content = result[0] if isinstance(result, tuple) else result
+    if isinstance(content, list):
+        return "\n".join(part for part in content if isinstance(part, str))
+    return content if isinstance(content, str) else str(content)
+
+
+def with_text(result, text):
+    """Copy of a tool result with its text part replaced"""
+    if isinstance(result, tuple):
+        return (text,) + tuple(result[1:])
+    return text
+
+
+def _chain(tool_name, coroutine, middlewares):
+    async def call_tool(arguments):
+        return await coroutine(**arguments)
+
+    handler = call_tool
+    for middleware in reversed(middlewares):
+        def bind(middleware=middleware, call_next=handler):
+            async def handle(arguments):
+                return await middleware(tool_name, arguments, call_next)
+            return handle
+        handler = bind()
+    return handler
+
+
+def _as_coroutine(handler):
+    async def call(**arguments):
+        return await handler(arguments)
+    return call
+
+
+def apply_middleware(tools, middlewares):
+    """Wrap tools so each call runs through `middlewares`, the first one outermost"""
+    if not middlewares:
+        return list(tools)
+    wrapped = []
+    for tool in tools:
+        wrapped.append(StructuredTool(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            coroutine=_as_coroutine(_chain(tool.name, tool.coroutine, middlewares)),
+            response_format=tool.response_format,
+            metadata=tool.metadata,
+        ))
+    return wrapped
@@ -0,0 +1,132 @@
+"""
+watchdog
+
+Loop and stall detection for agent runs.
+
+A stuck agent keeps going until the recursion limit: clicking the same
+hCaptcha iframe over and over, re-taking the same snapshot, or wandering
+without the page ever changing. `Watchdog` looks at every `agent.astream`
+step and reports a structured reason as soon as one of these holds:
+
+- repeated_tool_call: the same action with the same arguments was called
+  `max_repeats` times on the same page within the last `window` tool calls
+  (waiting, paging with the same "Next" ref or pressing the same key while
+  the page keeps changing is progress)
+- repeated_snapshot:  `max_repeats` consecutive snapshots returned the same tree
+- no_progress:        `stall_steps` tool results in a row without any change
+                      of page URL or accessibility tree
+
+`stream_agent` then stops the run and returns a failure report instead of
+burning the remaining steps.
+"""
+
+import hashlib
+import json
+from collections import deque
+
+from langchain_core.messages import AIMessage
+
+from test_pilot.compaction import PAGE_LINE, SNAPSHOT_BLOCK
+from test_pilot.tool_middleware import result_text
+
+NO_DIFF = "(no changes)"
+WATCHDOG_STOPPED = "stopped by the loop/stall watchdog"
+# Taking a snapshot after every action is normal; these are judged by their results
+OBSERVATION_TOOLS = {"browser_snapshot", "browser_take_screenshot", "browser_console_messages", "browser_network_requests", "browser_tab_list"}
+
+
+def _call_signature(call):
+    return f"{call['name']}({json.dumps(call['args'], sort_keys=True, ensure_ascii=False, default=str)})"
+
+
+class Watchdog:
+    """Detects repeated tool calls, repeated snapshots and runs without page changes"""
+
+    def __init__(self, max_repeats=4, window=8, stall_steps=10):
+        self.max_repeats = max_repeats
+        self.window = window
+        self.stall_steps = stall_steps
+        self._calls = deque(maxlen=window)
+        self._state = None
+        self._unchanged = 0
+        self._last_snapshot = None
+        self._same_snapshots = 0
+
+    def _page_state(self, text):
+        """Fingerprint of the page a tool result shows, or None if it shows no page"""
+        if "```diff" in text:
+            # Snapshot diffs (--snapshot-diff): an empty diff means the page did not change
+            return self._state if NO_DIFF in text else hashlib.sha256(text.encode()).hexdigest()
+        pages = PAGE_LINE.findall(text)
+        trees = SNAPSHOT_BLOCK.findall(text)
+        if not pages and not trees:
+            return None
+        return hashlib.sha256(json.dumps([pages, trees]).encode()).hexdigest()
+
+    def _observe_calls(self, message):
+        for call in getattr(message, "tool_calls", None) or []:
+            if call["name"] in OBSERVATION_TOOLS:
+                continue
+            # Keyed by the page the call was made on
+            signature = _call_signature(call)
+            self._calls.append((signature, self._state))
+            count = self._calls.count((signature, self._state))
+            if self.max_repeats and count >= self.max_repeats:
+                return {
+                    "reason": "repeated_tool_call",
+                    "detail": f"{signature} called {count} times on the same page in the last {len(self._calls)} tool calls",
+                }
+        return None
+
+    def _observe_result(self, message):
+        text = result_text((message.content,))
+        state = self._page_state(text)
+        if state is None or state == self._state:
+            self._unchanged += 1
+        else:
+            self._state, self._unchanged = state, 0
+        if message.name == "browser_snapshot" and state is not None:
+            self._same_snapshots = self._same_snapshots + 1 if state == self._last_snapshot else 1
+            self._last_snapshot = state
+            if self.max_repeats and self._same_snapshots >= self.max_repeats:
+                return {
+                    "reason": "repeated_snapshot",
+                    "detail": f"{self._same_snapshots} consecutive snapshots returned the same page",
+                }
+        if self.stall_steps and self._unchanged >= self.stall_steps:
+            return {
+                "reason": "no_progress",
+                "detail": f"{self._unchanged} tool results in a row without a change of the page",
+            }
+        return None
+
+    def observe(self, step):
+        """Inspect one `agent.astream` chunk; return a failure dict once the run is stuck"""
+        for update in step.values():
+            messages = update.get("messages", []) if isinstance(update, dict) else []
+            for message in messages if isinstance(messages, list) else [messages]:
+                if message.type == "ai":
+                    failure = self._observe_calls(message)
+                elif message.type == "tool":
+                    failure = self._observe_result(message)
+                else:
+                    failure = None
+                if failure:
+                    return failure
+        return None
+
+
+def watchdog_report(failure, step):
+    """Markdown failure report for a run stopped by the watchdog"""
+    return (
+        "# Test Suite Report\n\n"
+        f"**Result:** FAILED - {WATCHDOG_STOPPED}\n\n"
+        f"- Reason: `{failure['reason']}`\n"
+        f"- Detail: {failure['detail']}\n"
+        f"- Stopped at step: {step}\n"
+    )
+
+
+def stopped_step(failure, step):
+    """Final agent step standing in for a run stopped by the watchdog"""
+    return {"agent": {"messages": [AIMessage(content=watchdog_report(failure, step))]}, "watchdog": failure}
@@ -19,3 +19,116 @@ poetry run python tests/exploratory/test_pilot_simple.py \
 #   --two-stage-mode \
 #   --storage-file browser_storage.json  
 
+
+# BATCH: Run every suite in a directory (or glob) concurrently, merged into one report
+# poetry run python tests/exploratory/test_pilot_simple.py \
+#   --test-suite "docs/icims-ats-demo*.md" \
+#   --provider github_copilot \
+#   --model gpt-4.1 \
+#   --max-parallel 4 \
+#   --pool-size 4
+
+# PHASES: Run each '### Phase N:' section in its own session; phases declaring
+# 'Depends on: Phase 1' run in parallel once login has produced the storage state
+# poetry run python tests/exploratory/test_pilot_simple.py \
+#   --test-suite docs/icims-ats-demo.md \
+#   --provider github_copilot \
+#   --model gpt-4.1 \
+#   --phase-parallel
+
+# REPLAY: Record the tool calls of a successful run, then replay them without the LLM
+# (the agent takes over from the first step that no longer matches the page)
+# poetry run python tests/exploratory/test_pilot_simple.py \
+#   --test-suite docs/icims-ats-demo-simple.md \
+#   --provider github_copilot \
+#   --model gpt-4.1 \
+#   --replay
+
+# AUTH CACHE: Log in at most once per hour; later two-stage runs reuse the cached
+# storage state for the suite's website and account until it or its cookies expire
+# poetry run python tests/exploratory/test_pilot_simple.py \
+#   --test-suite docs/icims-ats-demo.md \
+#   --provider github_copilot \
+#   --model gpt-4.1 \
+#   --two-stage-mode \
+#   --auth-cache --auth-ttl 3600
+
+# FAN-OUT: Log in once, then run the main stage on 4 concurrent headless browsers
+# sharing the storage state (a worker hitting the login page triggers one shared re-login)
+# poetry run python tests/exploratory/test_pilot_simple.py \
+#   --test-suite docs/icims-ats-demo.md \
+#   --provider github_copilot \
+#   --model gpt-4.1 \
+#   --workers 4 --pool-size 4
+
+# LOAD: 10 virtual users started over 60s, held for 5 minutes and stopped over 60s,
+# pausing an exponentially distributed ~5s between iterations (replays recorded
+# traces when available, so most iterations need no LLM)
+# poetry run python tests/exploratory/test_pilot_simple.py \
+#   --test-suite docs/icims-ats-demo.md \
+#   --provider github_copilot \
+#   --model gpt-4.1 \
+#   --load-users 10 --ramp-up 60 --steady 300 --ramp-down 60 \
+#   --think-time exp:5 --auth-cache --replay
+
+# RESUME: Checkpoint every agent step and completed phase; rerunning the same
+# command after a crash skips finished phases and continues the interrupted one
+# poetry run python tests/exploratory/test_pilot_simple.py \
+#   --test-suite docs/icims-ats-demo.md \
+#   --provider github_copilot \
+#   --model gpt-4.1 \
+#   --phase-parallel --resume
+
+# FALLBACK: Fail over to a second provider on provider errors and 429s, and hedge
+# to it when the primary is slower than its p95 latency
+# poetry run python tests/exploratory/test_pilot_simple.py \
+#   --test-suite docs/icims-ats-demo.md \
+#   --provider github_copilot \
+#   --model gpt-4.1 \
+#   --fallback-provider openai --fallback-model gpt-4.1 --hedge
+
+# RATE LIMIT: Share 30 requests and 60k tokens per minute between all suites and
+# every process started with the same --rate-limit-db
+# poetry run python tests/exploratory/test_pilot_simple.py \
+#   --test-suite "docs/*.md" \
+#   --provider github_copilot \
+#   --model gpt-4.1 \
+#   --rpm 30 --tpm 60000 --rate-limit-db .test_pilot/rate_limits.sqlite
+
+# ROUTING: Routine steps on a small model; errors, unexpected pages and the final
+# report go to --model
+# poetry run python tests/exploratory/test_pilot_simple.py \
+#   --test-suite docs/icims-ats-demo.md \
+#   --provider github_copilot \
+#   --model gpt-4.1 \
+#   --fast-model gpt-4.1-mini
+
+# PUBLISH: Stream run/phase/step events live to an analyzer listening on a Unix socket
+# (also tcp:HOST:PORT, fifo:PATH or a file to tail)
+# poetry run python tests/exploratory/test_pilot_simple.py \
+#   --test-suite docs/icims-ats-demo.md \
+#   --provider github_copilot \
+#   --model gpt-4.1 \
+#   --publish unix:/tmp/trace-pilot.sock
+
+# RUN HISTORY: Every run is appended to .test_pilot/runs.sqlite; query it with
+# poetry run python -m test_pilot.run_history phases --suite icims-ats-demo --by week
+# poetry run python -m test_pilot.run_history flaky --since 30
+# poetry run python -m test_pilot.run_history slowest --limit 20
+
+# REGRESSIONS: After each run, phase duration, step count and token usage are compared
+# with the last 20 passed runs of the same suite content (median/MAD); regressions are
+# listed under "regressions" in test_report.json and the run exits with code 3
+# poetry run python tests/exploratory/test_pilot_simple.py \
+#   --test-suite docs/icims-ats-demo.md \
+#   --provider github_copilot \
+#   --model gpt-4.1 \
+#   --regression-window 20 --regression-threshold 3.5
+
+# PAGE METRICS: Navigation Timing, resources and Core Web Vitals of every page load,
+# per phase and summarized per URL in test_report.json (useful together with LOAD)
+# poetry run python tests/exploratory/test_pilot_simple.py \
+#   --test-suite docs/icims-ats-demo.md \
+#   --provider github_copilot \
+#   --model gpt-4.1 \
+#   --phase-parallel --page-metrics
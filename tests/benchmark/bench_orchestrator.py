@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Offline orchestrator benchmark.
+
+Runs `run_agent` from tests/exploratory/test_pilot_simple.py against the
+stand-in MCP server (fake_mcp_server.py) and a deterministic scripted chat
+model (fake_chat_model.py), so no browser, network or provider is needed.
+For each suite size it reports steps/sec, memory growth and the orchestrator
+overhead per step, i.e. wall time not spent inside the LLM or a tool call
+(this includes starting the stand-in server, amortized over the steps).
+
+Usage:
+    python tests/benchmark/bench_orchestrator.py --sizes 10,50,100 --nodes 200
+    python tests/benchmark/bench_orchestrator.py --compact-snapshots --snapshot-diff --json bench.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import io
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(HERE, "..", "exploratory"))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "src"))
+
+from mcp import StdioServerParameters
+
+import test_pilot_simple
+from fake_chat_model import FakeChatModel
+from test_pilot import events
+from test_pilot.agent_factory import AgentSettings
+from test_pilot.profiler import Profiler, percentile
+
+SUITE = """# Benchmark Suite
+
+Open the dashboard, search for a requisition and verify the results.
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline orchestrator benchmark (fake LLM, stand-in MCP server)")
+    parser.add_argument("--sizes", default="10,50,100", help="Comma-separated number of tool steps per suite")
+    parser.add_argument("--nodes", type=int, default=200, help="Nodes per canned accessibility snapshot")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per suite size (median is reported)")
+    parser.add_argument("--tool-latency-ms", type=float, default=0, help="Artificial delay per MCP tool call")
+    parser.add_argument("--compact-snapshots", action="store_true", help="Benchmark with snapshot compaction enabled")
+    parser.add_argument("--snapshot-diff", action="store_true", help="Benchmark with snapshot diffing enabled")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    return parser.parse_args()
+
+
+def fake_server_params(args):
+    return StdioServerParameters(
+        command=sys.executable,
+        args=[os.path.join(HERE, "fake_mcp_server.py"), "--nodes", str(args.nodes), "--latency-ms", str(args.tool_latency_ms)],
+    )
+
+
+def rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def run_once(args, steps):
+    profiler = Profiler()
+    test_pilot_simple.AGENT_SETTINGS = AgentSettings(
+        compact_snapshots=args.compact_snapshots,
+        snapshot_diff=args.snapshot_diff,
+        profiler=profiler,
+    )
+    llm = FakeChatModel(steps=steps)
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    # run_agent narrates every step on stdout; keep the benchmark output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        await test_pilot_simple.run_agent(llm, SUITE, server_params=fake_server_params(args))
+    wall_ms = (time.perf_counter() - started) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    llm_ms = sum(span["dur_us"] for span in profiler.spans if span["category"] == "llm") / 1000
+    tool_ms = sum(span["dur_us"] for span in profiler.spans if span["category"] == "tool") / 1000
+    prompt_tokens = [span["args"].get("input_tokens") or 0 for span in profiler.spans if span["category"] == "llm"]
+    return {
+        "wall_ms": wall_ms,
+        "steps_per_sec": steps / (wall_ms / 1000),
+        "overhead_ms_per_step": (wall_ms - llm_ms - tool_ms) / steps,
+        "peak_alloc_mb": peak / 1024 / 1024,
+        "last_prompt_tokens": prompt_tokens[-1] if prompt_tokens else 0,
+    }
+
+
+async def benchmark(args):
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    results = []
+    # Warm-up run: imports, the tool cache file and the first server spawn
+    await run_once(args, 1)
+    for steps in sizes:
+        rss_before = rss_mb()
+        runs = [await run_once(args, steps) for _ in range(args.repeat)]
+        row = {"steps": steps}
+        for key in runs[0]:
+            row[key] = round(percentile([run[key] for run in runs], 50), 2)
+        row["rss_growth_mb"] = round(rss_mb() - rss_before, 2)
+        results.append(row)
+        print(
+            f"{steps:>6} steps | {row['steps_per_sec']:>8.1f} steps/s | {row['overhead_ms_per_step']:>7.2f} ms overhead/step"
+            f" | peak alloc {row['peak_alloc_mb']:>7.2f} MB | RSS +{row['rss_growth_mb']:.2f} MB"
+            f" | last prompt {row['last_prompt_tokens']} tokens"
+        )
+    return results
+
+
+def main():
+    args = parse_args()
+    events.configure(os.devnull, "info")
+    json_path = os.path.abspath(args.json) if args.json else None
+    cwd = os.getcwd()
+    # Keep the tool cache of the stand-in server out of the working tree
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        print(f"Benchmark: nodes={args.nodes} repeat={args.repeat} compact={args.compact_snapshots} diff={args.snapshot_diff}")
+        results = asyncio.run(benchmark(args))
+        os.chdir(cwd)
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+        print(f"✅ Results saved to {json_path}")
+
+
+if __name__ == "__main__":
+    main()
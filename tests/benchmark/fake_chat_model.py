@@ -0,0 +1,47 @@
+"""
+Deterministic fake chat model for the offline benchmark.
+
+Replays a fixed cycle of Playwright tool calls until `steps` tool results are
+in the conversation, then answers with a markdown report. Token usage is
+estimated from the prompt size so prompt growth shows up in the profile.
+"""
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+TOOL_CYCLE = [
+    ("browser_navigate", {"url": "https://configrariet.icims.com/platform"}),
+    ("browser_snapshot", {}),
+    ("browser_click", {"element": "Clicked button", "ref": "e2"}),
+    ("browser_type", {"element": "Keyword search", "ref": "e3", "text": "Computer Programmer"}),
+    ("browser_wait_for", {"time": 0}),
+]
+
+
+class FakeChatModel(BaseChatModel):
+    steps: int = 10
+
+    @property
+    def _llm_type(self):
+        return "fake-scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        done = sum(1 for message in messages if isinstance(message, ToolMessage))
+        prompt_tokens = sum(len(str(message.content)) for message in messages) // 4
+        if done < self.steps:
+            name, arguments = TOOL_CYCLE[done % len(TOOL_CYCLE)]
+            message = AIMessage(
+                content="",
+                tool_calls=[{"name": name, "args": arguments, "id": f"call_{done}"}],
+                usage_metadata={"input_tokens": prompt_tokens, "output_tokens": 20, "total_tokens": prompt_tokens + 20},
+            )
+        else:
+            message = AIMessage(
+                content=f"# Test Suite Report\n\nAll {done} steps passed.\n\nRESULT: PASSED",
+                usage_metadata={"input_tokens": prompt_tokens, "output_tokens": 20, "total_tokens": prompt_tokens + 20},
+            )
+        return ChatResult(generations=[ChatGeneration(message=message)])
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Stand-in for `npx @playwright/mcp` used by the offline benchmark.
+
+Speaks the same MCP stdio protocol and exposes the Playwright tool names the
+agent uses, returning canned accessibility snapshots of a configurable size
+instead of driving a browser. Clicking toggles a counter node so consecutive
+snapshots differ slightly, like a real dashboard page.
+
+Usage: python fake_mcp_server.py [--nodes N] [--latency-ms MS]
+"""
+
+import argparse
+import asyncio
+
+from mcp.server.fastmcp import FastMCP
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--nodes", type=int, default=200, help="Number of nodes in each snapshot")
+parser.add_argument("--latency-ms", type=float, default=0, help="Artificial delay per tool call")
+args = parser.parse_args()
+
+server = FastMCP("fake-playwright", log_level="WARNING")
+page = {"url": "about:blank", "clicks": 0}
+
+
+def snapshot():
+    lines = ["- banner [ref=e1]:", f'  - button "Clicked {page["clicks"]} times" [ref=e2]']
+    for index in range(args.nodes):
+        ref = index + 10
+        lines.append(f"- generic [ref=e{ref}]:")
+        lines.append(f'  - link "Requisition {index:04d} - Computer Programmer" [ref=e{ref + args.nodes + 10}]')
+    return (
+        f"- Page URL: {page['url']}\n"
+        "- Page Title: Fake iCIMS Platform\n"
+        "- Page Snapshot:\n```yaml\n" + "\n".join(lines) + "\n```"
+    )
+
+
+async def respond(code):
+    if args.latency_ms:
+        await asyncio.sleep(args.latency_ms / 1000)
+    return f"### Ran Playwright code\n```js\n{code}\n```\n\n{snapshot()}"
+
+
+@server.tool()
+async def browser_navigate(url: str) -> str:
+    """Navigate to a URL"""
+    page["url"] = url
+    return await respond(f"await page.goto('{url}');")
+
+
+@server.tool()
+async def browser_snapshot() -> str:
+    """Capture accessibility snapshot of the current page"""
+    if args.latency_ms:
+        await asyncio.sleep(args.latency_ms / 1000)
+    return snapshot()
+
+
+@server.tool()
+async def browser_click(element: str, ref: str) -> str:
+    """Perform click on a web page"""
+    page["clicks"] += 1
+    return await respond(f"await page.getByRole('button', {{ name: '{element}' }}).click();")
+
+
+@server.tool()
+async def browser_type(element: str, ref: str, text: str, submit: bool = False) -> str:
+    """Type text into editable element"""
+    return await respond(f"await page.getByRole('textbox').fill('{text}');")
+
+
+@server.tool()
+async def browser_wait_for(time: float = 0) -> str:
+    """Wait for text to appear or disappear or a specified time to pass"""
+    return f"Waited for {time}"
+
+
+@server.tool()
+async def browser_evaluate(function: str) -> str:
+    """Evaluate JavaScript expression on page or element"""
+    return '### Result\n"{}"'
+
+
+@server.tool()
+async def browser_close() -> str:
+    """Close the page"""
+    page.update(url="about:blank", clicks=0)
+    return "No open pages available."
+
+
+if __name__ == "__main__":
+    server.run()